@@ -0,0 +1,74 @@
+import argparse
+import os
+import time
+
+from scripts.config_parser import parse_config, diff_configs
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "configuration")
+
+
+def synthetic_config(base_text, target_lines, variant=0):
+    # Grows a sample config to target_lines by adding interface, ACL and static route
+    # sections; variant shifts a few of them so two synthetic configs differ
+    lines = base_text.splitlines()
+    i = 0
+    while len(lines) < target_lines:
+        lines.extend([
+            f"interface GigabitEthernet{i // 48}/{i % 48}",
+            f" description uplink-{i}",
+            f" ip address 10.{i // 256 % 256}.{i % 256}.1 255.255.255.0",
+            " duplex full" if (i + variant) % 97 else " duplex half",
+            " no shutdown",
+            "!",
+            f"ip route 172.{i // 256 % 16 + 16}.{i % 256}.0 255.255.255.0 10.{i // 256 % 256}.{i % 256}.2",
+            f"access-list {100 + i % 100} permit ip host 10.0.{i % 256}.{i // 256 % 256} any",
+        ])
+        i += 1
+    return "\n".join(lines)
+
+
+def best_of(runs, fn):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Config parse and tree-diff timings")
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for name in sorted(os.listdir(CONFIG_DIR)):
+        with open(os.path.join(CONFIG_DIR, name)) as f:
+            text = f.read()
+        elapsed, tree = best_of(args.runs, lambda: parse_config(text))
+        print(f"parse {name:<20} {len(text.splitlines()):>8} lines {elapsed * 1e3:8.2f} ms")
+
+    for device in ("R1", "R2"):
+        with open(os.path.join(CONFIG_DIR, f"{device}_Backup.cfg")) as f:
+            backup = parse_config(f.read())
+        with open(os.path.join(CONFIG_DIR, f"{device}_Startup.cfg")) as f:
+            startup = parse_config(f.read())
+        elapsed, entries = best_of(args.runs, lambda: diff_configs(backup, startup))
+        print(f"diff  {device} Backup vs Startup   {len(entries):>5} changes {elapsed * 1e3:8.2f} ms")
+
+    with open(os.path.join(CONFIG_DIR, "R1_Backup.cfg")) as f:
+        base = f.read()
+    old_text = synthetic_config(base, args.lines)
+    new_text = synthetic_config(base, args.lines, variant=1)
+
+    parse_time, old = best_of(args.runs, lambda: parse_config(old_text))
+    new = parse_config(new_text)
+    diff_time, entries = best_of(args.runs, lambda: diff_configs(old, new))
+    print(f"parse synthetic {len(old_text.splitlines()):>8} lines {parse_time * 1e3:8.1f} ms")
+    print(f"diff  synthetic {len(entries):>8} changes {diff_time * 1e3:8.1f} ms")
+    print(f"parse both + diff: {(2 * parse_time + diff_time) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
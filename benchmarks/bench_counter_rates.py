@@ -0,0 +1,97 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from scripts import counter_arrays
+from scripts.poller import INTERFACE_COLUMNS, RATES, DeviceState, compute_rates, interface_rows
+
+
+def walked_columns(interfaces, counters, offset=0):
+    # what one poll of a device with this many interfaces returns, column by column
+    columns = {name: [] for name in INTERFACE_COLUMNS}
+    for i in range(interfaces):
+        index = str(i + 1)
+        columns['name'].append((index, "", f"Ethernet{i // 48}/{i % 48}"))
+        columns['oper'].append((index, "", "1" if i % 5 else "2"))
+        columns['speed'].append((index, "", "4294967295"))
+        columns['high_speed'].append((index, "", "10000"))
+        for name in ('in_octets', 'out_octets', 'in_errors', 'out_errors', 'hc_in_octets', 'hc_out_octets'):
+            value = counters[name][i] + offset * (i + 1)
+            bits = 64 if name.startswith("hc_") else 32
+            columns[name].append((index, "", str(value % 2 ** bits)))
+    return columns
+
+
+def timed(function, runs):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-poll CPU time of the counter join + rate stage")
+    parser.add_argument("--interfaces", type=int, default=100000)
+    parser.add_argument("--devices", type=int, default=100, help="interfaces are split across this many devices")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    per_device = args.interfaces // args.devices
+    rng = random.Random(1)
+    # start near the top of the 32-bit range so plenty of counters wrap between polls
+    counters = {name: [rng.randrange(2 ** 32 - 10 ** 7, 2 ** 32) for _ in range(per_device)]
+                for name in INTERFACE_COLUMNS}
+    first = walked_columns(per_device, counters)
+    second = walked_columns(per_device, counters, offset=12345)
+    print(f"{args.interfaces} interfaces on {args.devices} devices, {len(RATES)} rates each")
+
+    def python_poll():
+        rates = None
+        for _ in range(args.devices):
+            state = DeviceState()
+            compute_rates(state, 0.0, 1, interface_rows(list(first.values())))
+            rates = compute_rates(state, 60.0, 2, interface_rows(list(second.values())))
+        return rates
+
+    def numpy_poll():
+        per = {}
+        for d in range(args.devices):
+            before = counter_arrays.build_snapshot(0.0, 1, first, RATES)
+            after = counter_arrays.build_snapshot(60.0, 2, second, RATES)
+            rates = counter_arrays.rate_matrix(before, after, RATES)
+            per[f"D{d}"] = (after, counter_arrays.utilisation(after, rates))
+        return rates, per
+
+    # one snapshot is built per poll; the benchmark builds two to get a delta, so halve them
+    python_seconds, python_rates = timed(python_poll, args.runs)
+    numpy_seconds, (numpy_rates, per) = timed(numpy_poll, args.runs)
+    print(f"{'dict join + rates':<34} {python_seconds / 2 * 1e3:9.1f} ms per poll")
+    print(f"{'NumPy join + rates':<34} {numpy_seconds / 2 * 1e3:9.1f} ms per poll")
+
+    snapshot = per["D0"][0]
+    parse_seconds, _ = timed(lambda: counter_arrays.build_snapshot(60.0, 2, second, RATES), args.runs)
+    rate_seconds, _ = timed(lambda: counter_arrays.rate_matrix(snapshot, snapshot, RATES), args.runs)
+    print(f"{'  of which snapshot build':<34} {parse_seconds * args.devices * 1e3:9.1f} ms")
+    print(f"{'  of which delta/rate math':<34} {rate_seconds * args.devices * 1e3:9.1f} ms")
+
+    top_seconds, top = timed(lambda: counter_arrays.top_n(per, 10), args.runs)
+    print(f"{'top-10 utilisation':<34} {top_seconds * 1e3:9.1f} ms")
+
+    # both paths must agree, wraps included
+    mismatches = 0
+    for row, name in enumerate(snapshot.names):
+        for position, (suffix, _, _, _) in enumerate(RATES):
+            expected = python_rates.get((name, suffix))
+            if expected is None or not np.isclose(numpy_rates[row, position], expected):
+                mismatches += 1
+    print(f"rates matching the dict implementation: {numpy_rates.size - mismatches}/{numpy_rates.size}")
+    print(f"busiest: {top[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+MODULES = ("scripts.home", "scripts.device_mgmt", "scripts.config_mgmt", "scripts.device_config", "scripts.cli")
+
+# Loaded on first SSH session / SNMP walk / inventory read, never by importing a module
+HEAVY = ("netmiko", "paramiko", "cryptography", "pysnmp", "pyasn1", "yaml", "asyncio")
+
+
+def import_profile(module):
+    # (cumulative microseconds for module, {imported module: cumulative us}) from -X importtime
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    loaded = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            loaded[name.strip()] = int(cumulative)
+    return loaded.get(module, 0), loaded
+
+
+def launch_to_menu():
+    # wall time of the interactive entry point printing its menu and quitting
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "scripts.home"], cwd=ROOT, input="q\n",
+                   capture_output=True, text=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import cost of each entry module (python -X importtime)")
+    parser.add_argument("--runs", type=int, default=5, help="best of this many fresh interpreters")
+    parser.add_argument("--budget-ms", type=float, default=100.0,
+                        help="fail when any module takes longer than this to import")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'Module':<24} {'Import':>10}  Heavy dependencies loaded")
+    for module in MODULES:
+        best, loaded = min((import_profile(module) for _ in range(args.runs)), key=lambda r: r[0])
+        heavy = sorted(name for name in loaded if name.split(".")[0] in HEAVY and "." not in name)
+        over = best / 1e3 > args.budget_ms
+        failed |= over or bool(heavy)
+        flag = "  OVER BUDGET" if over else ""
+        print(f"{module:<24} {best / 1e3:8.1f} ms  {', '.join(heavy) or '-'}{flag}")
+
+    interpreter = min(
+        _timed([sys.executable, "-c", "pass"]) for _ in range(args.runs)
+    )
+    menu = min(launch_to_menu() for _ in range(args.runs))
+    print(f"\nlaunch to first menu: {menu * 1e3:.1f} ms "
+          f"({(menu - interpreter) * 1e3:.1f} ms over a bare interpreter)")
+    return 1 if failed else 0
+
+
+def _timed(command):
+    started = time.perf_counter()
+    subprocess.run(command, cwd=ROOT, capture_output=True)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import yaml
+
+from scripts.inventory import Inventory
+
+
+def write_inventory(path, count):
+    devices = [
+        {
+            'name': f"R{i}",
+            'hostname': f"10.{i // 65536}.{i // 256 % 256}.{i % 256}",
+            'device_type': "cisco_ios" if i % 4 else "cisco_xe",
+            'username': "admin",
+            'password': "cisco123",
+            'secret': "cisco123",
+            'groups': ["routers", f"site{i % 200}"],
+        }
+        for i in range(count)
+    ]
+    with open(path, 'w') as f:
+        yaml.safe_dump({'devices': devices}, f, default_flow_style=False)
+
+
+def timed(label, path, snapshot=True):
+    started = time.perf_counter()
+    inventory = Inventory(path, snapshot=snapshot)
+    inventory.get("R1")
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed * 1e3:10.1f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory load time: YAML parse vs compiled snapshot")
+    parser.add_argument("--devices", type=int, default=20000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, "device.yaml")
+        write_inventory(path, args.devices)
+        print(f"{args.devices} devices, {os.path.getsize(path) / 1e6:.1f} MB of YAML")
+
+        timed("YAML only (no snapshot)", path, snapshot=False)
+        cold = timed("cold: YAML + snapshot write", path)
+        warm = timed("warm: snapshot", path)
+        print(f"warm start is {cold / warm:.0f}x faster")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import random
+import time
+import resource
+
+from scripts.route_index import MASKS, FleetRoutes, RouteIndex, to_int
+
+# share of an Internet table by prefix length, roughly as seen in BGP today
+LENGTH_MIX = [(24, 0.58), (22, 0.10), (23, 0.08), (21, 0.05), (20, 0.05), (19, 0.04), (16, 0.03),
+              (18, 0.025), (17, 0.015), (15, 0.005), (14, 0.004), (13, 0.003), (12, 0.002), (11, 0.001),
+              (10, 0.001), (32, 0.01), (8, 0.0001)]
+
+
+def internet_table(count, seed=1):
+    # (network, length, next hop) for count distinct prefixes; ~4 upstream next hops
+    rng = random.Random(seed)
+    lengths, weights = zip(*LENGTH_MIX)
+    seen = set()
+    routes = [(0, 0, "192.0.2.1")]
+    while len(routes) < count:
+        length = rng.choices(lengths, weights)[0]
+        network = rng.getrandbits(32) & MASKS[length]
+        if (network, length) in seen:
+            continue
+        seen.add((network, length))
+        routes.append((network, length, f"192.0.2.{rng.randrange(1, 5)}"))
+    return routes
+
+
+def brute_force(routes, address):
+    best = None
+    for network, length, next_hop in routes:
+        if address & MASKS[length] == network and (best is None or length > best[0]):
+            best = (length, network)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Longest-prefix-match index on full-size route tables")
+    parser.add_argument("--prefixes", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--churn", type=float, default=0.01, help="share of prefixes changed by a re-walk")
+    parser.add_argument("--devices", type=int, default=4, help="devices for the fleet-wide query")
+    args = parser.parse_args()
+
+    routes = internet_table(args.prefixes)
+    print(f"{len(routes)} prefixes")
+
+    started = time.perf_counter()
+    index = RouteIndex()
+    index.sync(routes)
+    load_seconds = time.perf_counter() - started
+    # ru_maxrss is in kB on Linux; it includes the generated table itself
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+    print(f"{'initial load':<32} {load_seconds:8.2f} s   {index.nbytes() / 1e6:.1f} MB of arrays "
+          f"({index.nbytes() / len(index):.1f} bytes/prefix), process peak {rss:.0f} MB")
+
+    rng = random.Random(2)
+    addresses = [rng.getrandbits(32) for _ in range(args.lookups)]
+    started = time.perf_counter()
+    for address in addresses:
+        index.lookup(address)
+    per_lookup = (time.perf_counter() - started) / len(addresses)
+    dotted = [f"{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}" for a in addresses]
+    started = time.perf_counter()
+    for address in dotted:
+        index.lookup(address)
+    per_dotted = (time.perf_counter() - started) / len(dotted)
+    print(f"{'lookup (int / dotted string)':<32} {per_lookup * 1e6:8.2f} us / {per_dotted * 1e6:.2f} us")
+
+    # a re-walk where some prefixes were withdrawn, some announced and some moved
+    changed = int(len(routes) * args.churn)
+    rewalk = routes[changed:] + internet_table(changed, seed=3)[1:]
+    moved = [(network, length, "198.51.100.1") for network, length, _ in rewalk[:changed // 2]]
+    rewalk = moved + rewalk[changed // 2:]
+    started = time.perf_counter()
+    added, modified, removed = index.sync(rewalk)
+    print(f"{'re-walk sync':<32} {time.perf_counter() - started:8.2f} s   "
+          f"+{added} ~{modified} -{removed}")
+
+    # spot-check against a linear scan of the table
+    sample = addresses[:200] + [network | 1 for network, length, _ in rewalk[:200] if length < 32]
+    wrong = 0
+    for address in sample:
+        expected = brute_force(rewalk, address)
+        match = index.lookup(address)
+        got = (match.length, to_int(match.prefix)) if match else None
+        wrong += got != expected
+    print(f"lookups matching a linear scan: {len(sample) - wrong}/{len(sample)}")
+
+    fleet = FleetRoutes()
+    for d in range(args.devices):
+        fleet.sync(f"R{d}", rewalk if d else routes)
+    started = time.perf_counter()
+    for address in addresses[:10000]:
+        fleet.lookup(address)
+    per_fleet = (time.perf_counter() - started) / 10000
+    print(f"{'fleet lookup, ' + str(args.devices) + ' devices':<32} {per_fleet * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from scripts.show_parsers import SHOW_IP_ROUTE, Template, compile_template, parse_lines, parse_output
+
+HEADER = """Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP
+       D - EIGRP, EX - EIGRP external, O - OSPF, IA - OSPF inter area
+Gateway of last resort is 10.0.0.2 to network 0.0.0.0
+
+S*    0.0.0.0/0 [1/0] via 10.0.0.2
+"""
+
+
+def route_lines(count, seed=1):
+    # a BGP-heavy table with some OSPF ECMP pairs and connected routes, like an edge router's
+    rng = random.Random(seed)
+    yield from HEADER.splitlines(keepends=True)
+    for i in range(count):
+        prefix = f"{(i >> 16) % 223 + 1}.{(i >> 8) % 256}.{i % 256}.0"
+        kind = rng.random()
+        if kind < 0.8:
+            yield f"B        {prefix}/24 [20/0] via 192.0.2.{i % 250 + 1}, 1w2d\n"
+        elif kind < 0.95:
+            yield f"O        {prefix}/24 [110/{rng.randrange(2, 200)}] via 10.0.0.2, 00:01:02, Ethernet1/0\n"
+            yield "                     [110/20] via 10.0.0.3, 00:01:02, Ethernet1/1\n"
+        else:
+            yield f"C        {prefix}/24 is directly connected, Ethernet{i % 8}/0\n"
+
+
+def measure(label, function):
+    # timed on its own, then run again under tracemalloc for the peak, which slows it down
+    started = time.perf_counter()
+    count = function()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<36} {count:>9} routes {elapsed:7.2f}s {count / elapsed:>10.0f} routes/s "
+          f"peak {peak / 1e6:7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse large synthetic 'show ip route' outputs")
+    parser.add_argument("--routes", type=int, default=200000)
+    parser.add_argument("--small", type=int, default=2000, help="number of small outputs for the compile test")
+    args = parser.parse_args()
+
+    # per-call template compilation vs the cached one, on many small outputs; re keeps
+    # its own cache of compiled patterns, so it is purged each time to pay the full cost
+    small = "".join(route_lines(20))
+    started = time.perf_counter()
+    for _ in range(args.small):
+        re.purge()
+        Template(SHOW_IP_ROUTE)
+    uncached = (time.perf_counter() - started) / args.small
+    compile_template(SHOW_IP_ROUTE)
+    started = time.perf_counter()
+    for _ in range(args.small):
+        parse_output("show ip route", small)
+    per_output = (time.perf_counter() - started) / args.small
+    print(f"template compile {uncached * 1e6:.0f} us per call without the cache; "
+          f"a cached parse of a 20-route output takes {per_output * 1e6:.0f} us")
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, "routes.txt")
+        with open(path, 'w') as f:
+            f.writelines(route_lines(args.routes))
+        print(f"{args.routes} prefixes, {os.path.getsize(path) / 1e6:.1f} MB of output")
+
+        def whole_string():
+            with open(path, 'r') as f:
+                text = f.read()
+            return len(parse_output("show ip route", text))
+
+        def streamed():
+            count = 0
+            with open(path, 'r') as f:
+                for _ in parse_lines("show ip route", f):
+                    count += 1
+            return count
+
+        measure("read whole output, parse to list", whole_string)
+        measure("stream lines, count records", streamed)
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import argparse
+import time
+
+from benchmarks.snmp_responder import interface_table, spawn_responders
+from scripts.device_mgmt import snmp_table, snmp_table_many
+
+IF_COLUMNS = {
+    'name': (1, 3, 6, 1, 2, 1, 2, 2, 1, 2),
+    'admin': (1, 3, 6, 1, 2, 1, 2, 2, 1, 7),
+    'oper': (1, 3, 6, 1, 2, 1, 2, 2, 1, 8),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs concurrent int_status-style sweep over many agents")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--interfaces", type=int, default=24)
+    parser.add_argument("--rtt", type=float, default=0.02, help="simulated round-trip time in seconds")
+    args = parser.parse_args()
+
+    ports, shutdown = spawn_responders(interface_table(args.interfaces), args.devices, rtt=args.rtt)
+    targets = [("127.0.0.1", port) for port in ports]
+    try:
+        started = time.perf_counter()
+        for ip, port in targets:
+            snmp_table(IF_COLUMNS, ip, port=port)
+        serial = time.perf_counter() - started
+        print(f"serial     devices={args.devices:<6} wall={serial:.3f}s")
+
+        started = time.perf_counter()
+        results = snmp_table_many(IF_COLUMNS, targets)
+        concurrent = time.perf_counter() - started
+        failed = sum(1 for rows in results.values() if isinstance(rows, Exception))
+        print(f"concurrent devices={args.devices:<6} wall={concurrent:.3f}s failed={failed} "
+              f"speedup={serial / concurrent:.1f}x")
+    finally:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
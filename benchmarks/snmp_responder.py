@@ -0,0 +1,158 @@
+import bisect
+import multiprocessing
+import socket
+import threading
+import time
+
+from pyasn1.codec.ber import encoder, decoder
+from pysnmp.proto import api
+
+
+# Minimal read-only SNMP agent for benchmarks: answers Get, GetNext and GetBulk
+# from an in-memory table on 127.0.0.1, optionally delaying every reply to
+# emulate WAN round-trip time. v1_only makes it ignore v2c messages.
+class SnmpResponder:
+    def __init__(self, table, rtt=0.0, v1_only=False, drop_every=0):
+        self.oids = sorted(table)
+        self.values = [table[oid] for oid in self.oids]
+        self.rtt = rtt
+        self.v1_only = v1_only
+        self.drop_every = drop_every
+        self.requests = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self._stopped = False
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self.sock.close()
+
+    def _next(self, oid, pMod):
+        pos = bisect.bisect_right(self.oids, oid)
+        if pos >= len(self.oids):
+            return pMod.ObjectIdentifier(oid), None
+        return pMod.ObjectIdentifier(self.oids[pos]), self.values[pos]
+
+    def _value(self, pMod, value):
+        if value is None:
+            return pMod.EndOfMibView() if hasattr(pMod, "EndOfMibView") else pMod.null
+        if isinstance(value, int):
+            return pMod.Integer(value)
+        return pMod.OctetString(value)
+
+    def _serve(self):
+        while not self._stopped:
+            try:
+                wholeMsg, address = self.sock.recvfrom(65535)
+            except OSError:
+                return
+
+            version = int(api.decodeMessageVersion(wholeMsg))
+            if self.v1_only and version != api.SNMP_VERSION_1:
+                continue
+            self.requests += 1
+            if self.drop_every and self.requests % self.drop_every == 0:
+                continue
+
+            pMod = api.PROTOCOL_MODULES[version]
+            reqMsg, _ = decoder.decode(wholeMsg, asn1Spec=pMod.Message())
+            reqPDU = pMod.apiMessage.get_pdu(reqMsg)
+            rspMsg = pMod.apiMessage.get_response(reqMsg)
+            rspPDU = pMod.apiMessage.get_pdu(rspMsg)
+
+            names = [tuple(oid) for oid, _ in pMod.apiPDU.get_varbinds(reqPDU)]
+            varBinds = []
+            if reqPDU.isSameTypeWith(pMod.GetRequestPDU()):
+                for oid in names:
+                    pos = bisect.bisect_left(self.oids, oid)
+                    found = pos < len(self.oids) and self.oids[pos] == oid
+                    varBinds.append((pMod.ObjectIdentifier(oid),
+                                     self._value(pMod, self.values[pos]) if found else pMod.null))
+            elif hasattr(pMod, "GetBulkRequestPDU") and reqPDU.isSameTypeWith(pMod.GetBulkRequestPDU()):
+                repetitions = int(pMod.apiBulkPDU.get_max_repetitions(reqPDU))
+                current = list(names)
+                for _ in range(repetitions):
+                    for i, oid in enumerate(current):
+                        name, value = self._next(oid, pMod)
+                        varBinds.append((name, self._value(pMod, value)))
+                        current[i] = tuple(name)
+            else:
+                for oid in names:
+                    name, value = self._next(oid, pMod)
+                    if value is None and version == api.SNMP_VERSION_1:
+                        pMod.apiPDU.set_error_status(rspPDU, 2)
+                        pMod.apiPDU.set_error_index(rspPDU, 1)
+                        varBinds.append((pMod.ObjectIdentifier(oid), pMod.null))
+                    else:
+                        varBinds.append((name, self._value(pMod, value)))
+
+            pMod.apiPDU.set_varbinds(rspPDU, varBinds)
+            if self.rtt:
+                time.sleep(self.rtt)
+            try:
+                self.sock.sendto(encoder.encode(rspMsg), address)
+            except OSError:
+                return
+
+
+def interface_table(rows):
+    table = {}
+    for idx in range(1, rows + 1):
+        table[(1, 3, 6, 1, 2, 1, 2, 2, 1, 2, idx)] = f"Ethernet{idx // 48}/{idx % 48}"
+        table[(1, 3, 6, 1, 2, 1, 2, 2, 1, 7, idx)] = 1
+        table[(1, 3, 6, 1, 2, 1, 2, 2, 1, 8, idx)] = 1 if idx % 3 else 2
+    return table
+
+
+def cidr_route_table(routes):
+    # ipCidrRouteTable Dest, NextHop and Proto columns for (dest, mask, next hop, proto)
+    # rows; like a real agent's, each row is indexed dest.mask.tos.next-hop
+    table = {}
+    for dest, mask, next_hop, proto in routes:
+        index = tuple(int(x) for x in f"{dest}.{mask}.0.{next_hop}".split("."))
+        table[(1, 3, 6, 1, 2, 1, 4, 24, 4, 1, 1) + index] = dest
+        table[(1, 3, 6, 1, 2, 1, 4, 24, 4, 1, 4) + index] = next_hop
+        table[(1, 3, 6, 1, 2, 1, 4, 24, 4, 1, 7) + index] = proto
+    return table
+
+
+def _host_responders(table, count, rtt, ports, stop):
+    responders = [SnmpResponder(table, rtt=rtt).start() for _ in range(count)]
+    ports.put([r.port for r in responders])
+    stop.wait()
+    for r in responders:
+        r.stop()
+
+
+# Runs count responders in worker processes so that their encoding work doesn't
+# compete with the client under test for the GIL. Returns the ports and a stop().
+def spawn_responders(table, count, rtt=0.0, processes=4):
+    ports = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    workers = []
+    per_process = -(-count // processes)
+    for start in range(0, count, per_process):
+        worker = multiprocessing.Process(
+            target=_host_responders,
+            args=(table, min(per_process, count - start), rtt, ports, stop),
+            daemon=True
+        )
+        worker.start()
+        workers.append(worker)
+
+    all_ports = []
+    for _ in workers:
+        all_ports.extend(ports.get())
+
+    def shutdown():
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    return all_ports, shutdown
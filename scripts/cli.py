@@ -0,0 +1,308 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from scripts import device_config
+from scripts.command_pipeline import show_commands
+from scripts.config_mgmt import apply_saved_config, commit_backups, stream_config
+from scripts.connection_pool import pool
+from scripts.data_sources import QUERIES, compare_sources, router
+from scripts.device_config import check_output, push_config, transact_config
+from scripts.inventory import inventory
+from scripts.route_index import RouteIndex, routes_from_records
+from scripts.show_parsers import get_parser, parse_output
+
+# Non-interactive front end to the menu modules, for scripts and cron:
+#
+#   python -m scripts.cli interfaces --select groups=routers --format csv
+#   python -m scripts.cli backup --device R1 --device R2 --commit
+#   python -m scripts.cli static-route add 10.9.0.0 255.255.0.0 10.0.0.2 --select "group=edge"
+#
+# Every subcommand runs on the selected devices concurrently and prints one row per
+# record (read views) or per device (actions), plus a devices/second summary on stderr.
+
+
+def _query(query):
+    # through the data source router: SNMP or SSH, whichever is cheapest and working
+    def job(device, args):
+        records, source = router.fetch(device, query, args.timeout, None if args.source == "auto" else args.source)
+        return [dict(record, source=source) for record in records]
+    return job
+
+
+def _lookup(device, args):
+    # the route each address takes on this device, longest prefix match
+    records, source = router.fetch(device, "routes", args.timeout, None if args.source == "auto" else args.source)
+    index = RouteIndex()
+    index.sync(routes_from_records(records))
+    rows = []
+    for address in args.addresses:
+        match = index.lookup(address)
+        rows.append({'address': address, 'prefix': f"{match.prefix}/{match.length}" if match else None,
+                     'next_hop': ", ".join(match.next_hops) if match else None, 'source': source})
+    return rows
+
+
+def _check_sources(device, args):
+    # one row per query: does every transport return the same records?
+    rows = []
+    for query in args.queries or QUERIES:
+        only = compare_sources(device, query, args.timeout)
+        row = {'query': query, 'result': "same" if not any(only.values()) else "different"}
+        row.update({f"only_{source}": len(records) for source, records in only.items()})
+        rows.append(row)
+    return rows
+
+
+def _show(device, args):
+    outputs = show_commands(device, args.commands, args.timeout)
+    rows = []
+    for command, output in outputs.items():
+        if not args.parse or get_parser(command) is None:
+            rows.append({'command': command, 'output': output})
+            continue
+        for record in parse_output(command, output):
+            fields = {name: ", ".join(value) if isinstance(value, list) else value
+                      for name, value in record._asdict().items()}
+            rows.append(dict({'command': command}, **fields))
+    return rows
+
+
+def _stream_backup(suffix):
+    def job(device, args):
+        path, checksum = stream_config(device, suffix, args.timeout)
+        return [{'path': path, 'checksum': checksum}]
+    return job
+
+
+def _load(device, args):
+    sent, output = apply_saved_config(device, args.source.capitalize(), args.full, args.timeout)
+    check_output(output)
+    return [{'lines_sent': "all" if sent is None else sent}]
+
+
+def _config_commands(args):
+    if args.command == "set-ip":
+        return device_config.ip_address_commands(args.interface, args.ip, args.mask)
+    if args.command == "hostname":
+        return device_config.hostname_commands(args.hostname)
+    if args.command == "default-route":
+        return device_config.default_route_commands(args.next_hop)
+    if args.command == "static-route":
+        return device_config.static_route_commands(args.destination, args.mask, args.next_hop,
+                                                   delete=args.action == "delete")
+    if args.command == "ospf":
+        return device_config.ospf_commands(args.process_id, args.network, args.wildcard, args.area)
+    raise ValueError(f"Not a config command: {args.command}")
+
+
+JOBS = {
+    "interfaces": _query("interfaces"),
+    "routes": _query("routes"),
+    "addresses": _query("addresses"),
+    "protocols": _query("protocols"),
+    "lookup": _lookup,
+    "check-sources": _check_sources,
+    "show": _show,
+    "backup": _stream_backup("Backup"),
+    "save": _stream_backup("Startup"),
+    "load": _load,
+}
+
+CONFIG_COMMANDS = ("set-ip", "hostname", "default-route", "static-route", "ospf")
+
+
+def _run_one(job, device, args):
+    started = time.monotonic()
+    try:
+        records = job(device, args)
+        error = None
+    except Exception as e:
+        records, error = [], str(e)
+    seconds = time.monotonic() - started
+
+    status = "error" if error else "ok"
+    base = {'device': device['name'], 'status': status, 'seconds': round(seconds, 3), 'error': error}
+    if error or not records:
+        return [base]
+    # a record field named like a job column (e.g. an interface's status) keeps a prefix
+    return [dict(base, **{f"record_{key}" if key in base else key: value for key, value in record.items()})
+            for record in records]
+
+
+def run_jobs(job, devices, args):
+    rows = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(_run_one, job, device, args): device for device in devices}
+        for future in as_completed(futures):
+            rows.extend(future.result())
+            # one pass per device: free the session as soon as its job is done
+            pool.close(futures[future]['name'])
+    rows.sort(key=lambda row: row['device'])
+    return rows
+
+
+def run_config(commands, devices, args):
+    if args.transaction:
+        results = transact_config(devices, commands, max_workers=args.workers, timeout=args.timeout)
+        return [dict(r, seconds=round(r['seconds'], 3)) for r in sorted(results, key=lambda r: r['device'])]
+
+    results = push_config(devices, commands, max_workers=args.workers, canary=args.canary,
+                          wave_size=args.wave_size, max_failures=args.max_failures, timeout=args.timeout)
+    return [
+        {'device': r['device'], 'status': "error" if r['status'] == "failed" else r['status'],
+         'seconds': round(r['seconds'], 3), 'error': r['error']}
+        for r in sorted(results, key=lambda r: r['device'])
+    ]
+
+
+def _columns(rows):
+    columns = []
+    for row in rows:
+        for key in row:
+            if key not in columns:
+                columns.append(key)
+    return columns
+
+
+def write_rows(rows, fmt, out=None):
+    out = out or sys.stdout
+    if fmt == "json":
+        json.dump(rows, out, indent=2, default=str)
+        out.write("\n")
+        return
+
+    columns = _columns(rows)
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+
+    cells = [["" if row.get(c) is None else str(row[c]) for c in columns] for row in rows]
+    widths = [max([len(c)] + [len(line[i]) for line in cells]) for i, c in enumerate(columns)]
+    out.write("  ".join(f"{c:<{w}}" for c, w in zip(columns, widths)).rstrip() + "\n")
+    for line in cells:
+        out.write("  ".join(f"{cell:<{w}}" for cell, w in zip(line, widths)).rstrip() + "\n")
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--select", help="inventory selector, e.g. 'groups=routers AND device_type=cisco_ios'")
+    common.add_argument("--device", action="append", dest="names", help="only the named device (repeatable)")
+    common.add_argument("--workers", type=int, default=20, help="devices handled at the same time")
+    common.add_argument("--timeout", type=int, default=60, help="per-device timeout in seconds")
+    common.add_argument("--format", choices=("table", "json", "csv"), default="table")
+
+    parser = argparse.ArgumentParser(description="Run network automation tasks without the menus")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = argparse.ArgumentParser(add_help=False, parents=[common])
+    query.add_argument("--source", choices=("auto", "snmp", "ssh"), default="auto",
+                       help="transport to read from; auto picks the fastest working one per device")
+    query.add_argument("--metrics", action="store_true",
+                       help="print per-source latency and health to stderr afterwards")
+
+    commands.add_parser("interfaces", parents=[query], help="interface admin/oper status")
+    commands.add_parser("routes", parents=[query], help="IP routing table")
+    commands.add_parser("addresses", parents=[query], help="IP addresses per interface")
+    commands.add_parser("protocols", parents=[query], help="routing protocol per route")
+
+    check = commands.add_parser("check-sources", parents=[common],
+                                help="read each query over SNMP and SSH and compare the records")
+    check.add_argument("--query", action="append", dest="queries", choices=QUERIES,
+                       help="only this query (repeatable; default: all of them)")
+
+    lookup = commands.add_parser("lookup", parents=[query], help="longest-prefix match of addresses on each device")
+    lookup.add_argument("addresses", nargs="+", help="e.g. 10.1.2.3 8.8.8.8")
+
+    show = commands.add_parser("show", parents=[common],
+                               help="run show commands, pipelined down one session per device")
+    show.add_argument("commands", nargs="+", help='e.g. "show version" "show ip interface brief"')
+    show.add_argument("--parse", action="store_true",
+                      help="one row per parsed record for commands with a parser (show ip route, ...)")
+
+    backup = commands.add_parser("backup", parents=[common], help="save running-config as <name>_Backup.cfg")
+    save = commands.add_parser("save", parents=[common], help="save running-config as <name>_Startup.cfg")
+    for sub in (backup, save):
+        sub.add_argument("--commit", action="store_true", help="commit the changed files to git")
+        sub.add_argument("--local-only", action="store_true", help="commit without pushing")
+
+    load = commands.add_parser("load", parents=[common], help="restore a saved config")
+    load.add_argument("source", choices=("backup", "startup"))
+    load.add_argument("--full", action="store_true", help="replay the whole file instead of the delta")
+
+    config = argparse.ArgumentParser(add_help=False, parents=[common])
+    config.add_argument("--canary", type=int, default=1, help="devices changed on their own first")
+    config.add_argument("--wave-size", type=int, help="devices changed per wave after the canary (default: all)")
+    config.add_argument("--max-failures", type=int, default=1,
+                        help="stop starting new devices after this many failures (0 = never)")
+    config.add_argument("--transaction", action="store_true",
+                        help="apply to all devices or none: roll every device back if any one fails")
+
+    set_ip = commands.add_parser("set-ip", parents=[config], help="set an interface address")
+    set_ip.add_argument("interface")
+    set_ip.add_argument("ip")
+    set_ip.add_argument("mask")
+
+    hostname = commands.add_parser("hostname", parents=[config], help="change the hostname")
+    hostname.add_argument("hostname")
+
+    default_route = commands.add_parser("default-route", parents=[config], help="add a default route")
+    default_route.add_argument("next_hop")
+
+    static_route = commands.add_parser("static-route", parents=[config], help="add or delete a static route")
+    static_route.add_argument("action", choices=("add", "delete"))
+    static_route.add_argument("destination")
+    static_route.add_argument("mask")
+    static_route.add_argument("next_hop")
+
+    ospf = commands.add_parser("ospf", parents=[config], help="advertise a network in OSPF")
+    ospf.add_argument("process_id")
+    ospf.add_argument("network")
+    ospf.add_argument("wildcard")
+    ospf.add_argument("area")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        devices = inventory.select(args.select, name=args.names)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not devices:
+        print("No devices matched", file=sys.stderr)
+        return 2
+
+    started = time.monotonic()
+    if args.command in CONFIG_COMMANDS:
+        rows = run_config(_config_commands(args), devices, args)
+    else:
+        rows = run_jobs(JOBS[args.command], devices, args)
+    elapsed = time.monotonic() - started
+
+    if args.command in ("backup", "save") and args.commit:
+        results = [{'ok': row['status'] == "ok", 'path': row.get('path')} for row in rows]
+        changed = commit_backups(results, push=not args.local_only,
+                                 commit_msg=f"Fleet config {args.command}")
+        print(f"{len(changed)} changed config(s) committed", file=sys.stderr)
+
+    write_rows(rows, args.format)
+    if getattr(args, 'metrics', False):
+        print(file=sys.stderr)
+        write_rows(router.metrics(), "table", sys.stderr)
+
+    failed = {row['device'] for row in rows if row['status'] not in ("ok", "committed")}
+    print(f"{len(devices)} device(s) in {elapsed:.2f}s ({len(devices) / max(elapsed, 1e-9):.1f} devices/s), "
+          f"{len(failed)} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
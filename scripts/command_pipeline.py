@@ -0,0 +1,57 @@
+import re
+import time
+
+from scripts.connection_pool import pool
+
+
+def send_pipelined(connection, commands, read_timeout=60, poll_interval=0.02):
+    # Writes every show command down an open netmiko session in one go instead of
+    # one command per round trip, then splits what comes back at each prompt. The
+    # device runs them in order and prints its prompt after each, so output n is
+    # what lies between prompt n-1 and prompt n, minus the echoed command. Paging
+    # must be off (netmiko's session preparation sends "terminal length 0").
+    # Returns the outputs in command order.
+    if not commands:
+        return []
+    prompt = connection.find_prompt()
+    # a prompt only counts at the start of a line, so "hostname R1#..." text can't split output
+    boundary = re.compile(r"(?:^|\n)" + re.escape(prompt) + r"[^\n]*")
+
+    connection.write_channel("".join(command + connection.RETURN for command in commands))
+
+    buffer = ""
+    deadline = time.monotonic() + read_timeout
+    while True:
+        chunk = connection.read_channel()
+        if chunk:
+            buffer += chunk.replace("\r\n", "\n").replace("\r", "")
+            deadline = time.monotonic() + read_timeout
+            # done once the prompt has come back after the last command, with nothing after it
+            if buffer.rstrip().endswith(prompt) and len(boundary.findall(buffer)) >= len(commands):
+                break
+        elif time.monotonic() > deadline:
+            raise TimeoutError(f"No prompt after {read_timeout}s; {len(boundary.findall(buffer))} of "
+                               f"{len(commands)} commands finished")
+        else:
+            time.sleep(poll_interval)
+
+    # segment 0 runs up to the first prompt; each later boundary carries the echo of
+    # the next command on the prompt line itself (typed ahead) or on the line below
+    segments = boundary.split(buffer)
+    echoes = [""] + [match.group(0).lstrip("\n")[len(prompt):] for match in boundary.finditer(buffer)]
+    outputs = []
+    for position, command in enumerate(commands):
+        text = segments[position]
+        if not echoes[position].strip():
+            # echo was not on the prompt line, so it starts this segment
+            first, _, rest = text.lstrip("\n").partition("\n")
+            text = rest if first.strip() == command.strip() else text
+        outputs.append(text.strip("\n"))
+    return outputs
+
+
+def show_commands(device, commands, read_timeout=60):
+    # {command: output} from one pooled session
+    with pool.session(device) as connection:
+        outputs = send_pipelined(connection, commands, read_timeout)
+    return dict(zip(commands, outputs))
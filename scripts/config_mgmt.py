@@ -1,15 +1,16 @@
 import os
-import yaml
-from netmiko import ConnectHandler
 import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-
-def load_devices():
-    base_dir = os.path.dirname(os.path.abspath(__file__))  # gets path to scripts/
-    yaml_path = os.path.join(base_dir, "..", "inventory", "device.yaml")
-
-    with open(yaml_path, 'r') as f:
-        return yaml.safe_load(f)["devices"]
+from scripts.config_parser import parse_config, config_delta, diff_configs, format_diff
+from scripts.config_store import store
+from scripts.config_stream import FileSink, TerminalSink, stream_command
+from scripts.connection_pool import pool
+from scripts.git_batch import CommitBatcher
+from scripts.inventory import inventory, load_devices
+from scripts.snmp_cache import cache
 
 
 def get_config_path(filename):
@@ -30,54 +31,37 @@ def submenu():
     print("8. Load Backup Configuration")
     print("9. Change Device")
     print("10. Exit")
+    print("11. Compare Running with Saved/Backup")
 
     return input("\nSelect what you want to do")
 
 
 def git_push(filepath, commit_msg="Config Push"):
     try:
-        subprocess.run(["git", "add", filepath], check=True)
-        subprocess.run(["git", "commit", "-m", commit_msg], check=True)
-        subprocess.run(["git", "push"], check=True)
-        print("Config pushed to GitHub successfully.")
+        batcher = CommitBatcher()
+        batcher.add(filepath)
+        if batcher.commit(commit_msg):
+            print("Config pushed to GitHub successfully.")
     except subprocess.CalledProcessError as e:
         print(f"Git operation failed: {e}")
 
 
 def view_running_config(device):
-    netmiko_dev = {
-        'device_type': device['device_type'],
-        'host': device['hostname'],
-        'username': device['username'],
-        'password': device['password'],
-        'secret': device['secret']
-    }
     try:
-        connection = ConnectHandler(**netmiko_dev)
-        connection.enable()
-        print(f"Connected to {netmiko_dev['host']}")
-        output = connection.send_command("show running-config")
-        print(output, "\n\n")
-        connection.disconnect()
+        with pool.session(device) as connection:
+            print(f"Connected to {device['hostname']}")
+            stream_command(connection, "show running-config", TerminalSink())
+        print("\n\n")
     except Exception as e:
         print(f"Failed to connect: {e}")
 
 
 def view_startup_config(device):
-    netmiko_dev = {
-        'device_type': device['device_type'],
-        'host': device['hostname'],
-        'username': device['username'],
-        'password': device['password'],
-        'secret': device['secret']
-    }
     try:
-        connection = ConnectHandler(**netmiko_dev)
-        connection.enable()
-        print(f"Connected to {netmiko_dev['host']}")
-        output = connection.send_command("show startup-config")
+        with pool.session(device) as connection:
+            print(f"Connected to {device['hostname']}")
+            output = connection.send_command("show startup-config")
         print(output, "\n\n")
-        connection.disconnect()
     except Exception as e:
         print(f"Failed to connect: {e}")
 
@@ -96,46 +80,39 @@ def view_backup_config(device):
 
 
 def save_config_gns(device):
-    netmiko_dev = {
-        'device_type': device['device_type'],
-        'host': device['hostname'],
-        'username': device['username'],
-        'password': device['password'],
-        'secret': device['secret'],
-        'session_log': 'netmiko_debug.log'
-    }
     try:
-        connection = ConnectHandler(**netmiko_dev)
-        connection.enable()
-
-        print(f"Connected to {netmiko_dev['host']}")
-        output = connection.send_command_timing("write")
-
+        with pool.session(device, session_log='netmiko_debug.log') as connection:
+            print(f"Connected to {device['hostname']}")
+            output = connection.send_command_timing("write")
         print(output, "\n\n")
-        connection.disconnect()
     except Exception as e:
         print(f"Failed to connect: {e}")
 
 
-def save_config(device):
-    netmiko_dev = {
-        'device_type': device['device_type'],
-        'host': device['hostname'],
-        'username': device['username'],
-        'password': device['password'],
-        'secret': device['secret']
-    }
+def fetch_running_config(device, read_timeout=60):
+    with pool.session(device, conn_timeout=read_timeout) as connection:
+        return connection.send_command("show running-config", read_timeout=read_timeout)
+
+
+def stream_config(device, suffix="Backup", timeout=120):
+    # running-config goes straight from the channel to <name>_<suffix>.cfg, then into
+    # the archive from disk, so the whole config is never held in memory
+    full_path = get_config_path(f"{device['name']}_{suffix}.cfg")
+    with pool.session(device, conn_timeout=timeout) as connection:
+        checksum, _ = stream_command(connection, "show running-config", FileSink(full_path), timeout)
+
     try:
-        connection = ConnectHandler(**netmiko_dev)
-        connection.enable()
-        print(f"Connected to {netmiko_dev['host']}")
-        output = connection.send_command("show running-config")
-        filename = f"{device['name']}_Startup.cfg"
-        full_path = get_config_path(filename)
+        with open(full_path, 'r') as f:
+            store.put(f"{device['name']}_{suffix}", f)
+    except OSError as e:
+        print(f"Archiving {device['name']} failed: {e}")
+    return full_path, checksum
 
-        with open(full_path, 'w') as f:
-            f.write(output)
-        connection.disconnect()
+
+def save_config(device):
+    try:
+        print(f"Connecting to {device['hostname']}")
+        full_path, _ = stream_config(device, "Startup")
 
         git_push(full_path, f"Backup config for {device['name']}")
 
@@ -144,25 +121,9 @@ def save_config(device):
 
 
 def backup_config(device):
-    netmiko_dev = {
-        'device_type': device['device_type'],
-        'host': device['hostname'],
-        'username': device['username'],
-        'password': device['password'],
-        'secret': device['secret']
-    }
     try:
-        connection = ConnectHandler(**netmiko_dev)
-        connection.enable()
-        print(f"Connected to {netmiko_dev['host']}")
-        output = connection.send_command("show running-config")
-
-        filename = f"{device['name']}_Backup.cfg"
-        full_path = get_config_path(filename)
-
-        with open(full_path, 'w') as f:
-            f.write(output)
-        connection.disconnect()
+        print(f"Connecting to {device['hostname']}")
+        full_path, _ = stream_config(device, "Backup")
 
         git_push(full_path, f"Backup config for {device['name']}")
 
@@ -170,50 +131,118 @@ def backup_config(device):
         print(f"Failed to connect: {e}")
 
 
-def load_backup_config(device):
-    netmiko_dev = {
-        'device_type': device['device_type'],
-        'host': device['hostname'],
-        'username': device['username'],
-        'password': device['password'],
-        'secret': device['secret']
-    }
+def backup_device(device, timeout=60):
+    started = time.monotonic()
     try:
-        connection = ConnectHandler(**netmiko_dev)
-        connection.enable()
-        print(f"Connected to {netmiko_dev['host']}")
+        path, checksum = stream_config(device, "Backup", timeout)
+        return {'device': device['name'], 'ok': True, 'path': path, 'checksum': checksum,
+                'seconds': time.monotonic() - started, 'error': None}
+    except Exception as e:
+        return {'device': device['name'], 'ok': False, 'path': None, 'checksum': None,
+                'seconds': time.monotonic() - started, 'error': str(e)}
+    finally:
+        # Fleet runs touch every device once; don't leave thousands of idle sessions open
+        pool.close(device['name'])
+
+
+def backup_all(devices, max_workers=20, timeout=60):
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(backup_device, device, timeout) for device in devices]
+        for future in as_completed(futures):
+            results.append(future.result())
+    results.sort(key=lambda r: r['device'])
+    return results
+
+
+def commit_backups(results, push=True, commit_msg="Fleet config backup"):
+    batcher = CommitBatcher(push=push)
+    for r in results:
+        if r['ok']:
+            batcher.add(r['path'])
+    try:
+        return batcher.commit(commit_msg)
+    except subprocess.CalledProcessError as e:
+        print(f"Git operation failed: {e}", file=sys.stderr)
+        return []
+
 
-        filename = f"{device['name']}_Backup.cfg"
-        full_path = get_config_path(filename)
-        connection.send_config_from_file(full_path)
+def print_backup_report(results):
+    print(f"{'Device':<20} {'Result':<10} {'Time':<10} {'Detail'}")
+    for r in results:
+        status = "ok" if r['ok'] else "FAILED"
+        detail = r['path'] if r['ok'] else r['error']
+        print(f"{r['device']:<20} {status:<10} {r['seconds']:<10.2f} {detail}")
 
-        connection.disconnect()
+    failed = sum(1 for r in results if not r['ok'])
+    print(f"\n{len(results) - failed}/{len(results)} devices backed up, {failed} failed")
 
+
+def apply_saved_config(device, suffix, full=False, timeout=60):
+    # Brings the running config in line with <name>_<suffix>.cfg and returns
+    # (number of lines sent, device output); a full load replays the whole file
+    filename = f"{device['name']}_{suffix}.cfg"
+    full_path = get_config_path(filename)
+    try:
+        with pool.session(device, conn_timeout=timeout) as connection:
+            if full:
+                return None, connection.send_config_from_file(full_path, read_timeout=timeout)
+
+            with open(full_path, 'r') as f:
+                target = parse_config(f)
+            running = parse_config(connection.send_command("show running-config", read_timeout=timeout))
+            commands = config_delta(running, target)
+            if not commands:
+                return 0, ""
+            return len(commands), connection.send_config_set(commands, read_timeout=timeout)
+    finally:
+        cache.invalidate(device['hostname'])
+
+
+def restore_config(device, suffix, full=False):
+    filename = f"{device['name']}_{suffix}.cfg"
+    try:
+        print(f"Connecting to {device['hostname']}")
+        sent, output = apply_saved_config(device, suffix, full)
     except Exception as e:
         print(f"Failed to connect: {e}")
+        return None
 
+    if sent == 0:
+        print(f"Running configuration already matches {filename}")
+    elif sent:
+        print(f"Applied {sent} changed line(s) from {filename}")
+    print(output)
+    return output
 
-def load_startup_config(device):
-    netmiko_dev = {
-        'device_type': device['device_type'],
-        'host': device['hostname'],
-        'username': device['username'],
-        'password': device['password'],
-        'secret': device['secret']
-    }
-    try:
-        connection = ConnectHandler(**netmiko_dev)
-        connection.enable()
-        print(f"Connected to {netmiko_dev['host']}")
 
-        filename = f"{device['name']}_Startup.cfg"
-        full_path = get_config_path(filename)
-        output = connection.send_config_from_file(full_path)
+def load_backup_config(device, full=False):
+    return restore_config(device, "Backup", full)
+
 
-        connection.disconnect()
+def load_startup_config(device, full=False):
+    return restore_config(device, "Startup", full)
 
+
+def compare_configs(device):
+    try:
+        running = parse_config(fetch_running_config(device))
     except Exception as e:
         print(f"Failed to connect: {e}")
+        return
+
+    for suffix in ("Startup", "Backup"):
+        filename = get_config_path(f"{device['name']}_{suffix}.cfg")
+        try:
+            with open(filename, 'r') as f:
+                saved = parse_config(f)
+        except FileNotFoundError:
+            print(f"\n{suffix} file not found: {filename}")
+            continue
+
+        entries = diff_configs(saved, running)
+        print(f"\n--- {device['name']}_{suffix}.cfg  +++ running-config")
+        print(format_diff(entries) if entries else "No differences")
 
 
 def main():
@@ -224,7 +253,7 @@ def main():
             print(f"- {device['name']}")
 
         target = input("Select a router; R1 or R2: ").strip()
-        device = next((d for d in devices if d['name'] == target), None)
+        device = inventory.get(target)
         if not device:
             print("Device not found.")
             return
@@ -263,6 +292,9 @@ def main():
             elif choice == '10':
                 return
 
+            elif choice == '11':
+                compare_configs(device)
+
             else:
                 print("Invalid choice")
 
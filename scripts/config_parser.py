@@ -0,0 +1,308 @@
+from collections import namedtuple
+
+# Output of "show running-config" / saved files that isn't configuration
+PREAMBLE_PREFIXES = ("Building configuration", "Current configuration", "Using ")
+
+DiffEntry = namedtuple("DiffEntry", ["op", "path", "block"])
+
+
+# One configuration line and the lines nested under it, keyed by their text so
+# that sections can be matched between two configs in constant time. Free-text
+# bodies (banners, certificates) go in text instead, in order and with repeats.
+class ConfigBlock:
+    __slots__ = ("line", "children", "text")
+
+    def __init__(self, line):
+        self.line = line
+        self.children = {}
+        self.text = None
+
+    def add(self, line):
+        child = self.children.get(line)
+        if child is None:
+            child = self.children[line] = ConfigBlock(line)
+        return child
+
+    def find(self, *path):
+        block = self
+        for line in path:
+            block = block.children.get(line)
+            if block is None:
+                return None
+        return block
+
+    def sections(self, prefix=""):
+        return [child for line, child in self.children.items() if line.startswith(prefix)]
+
+    def lines(self, depth=0):
+        for line in self.text or ():
+            yield depth, line
+        for child in self.children.values():
+            yield depth, child.line
+            yield from child.lines(depth + 1)
+
+    def __len__(self):
+        return len(self.children)
+
+    def __repr__(self):
+        return f"ConfigBlock({self.line!r}, {len(self.children)} children)"
+
+
+def parse_config(text):
+    lines = text.splitlines() if isinstance(text, str) else text
+    root = ConfigBlock(None)
+    # stack of (indent, block); the root sits below every real indent
+    stack = [(-1, root)]
+    text_end = None
+    text_block = None
+
+    for raw in lines:
+        raw = raw.rstrip("\r\n")
+
+        if text_end is not None:
+            # banner bodies are free text up to the delimiter, kept verbatim;
+            # certificate bodies are hex up to "quit"
+            if text_end == "quit":
+                raw = raw.strip()
+            text_block.text.append(raw)
+            if raw == "quit" if text_end == "quit" else text_end in raw:
+                text_end = None
+            continue
+
+        stripped = raw.strip()
+        if not stripped or stripped == "end" or stripped.startswith(PREAMBLE_PREFIXES):
+            continue
+        if stripped[0] == "!":
+            continue
+
+        indent = len(raw) - len(raw.lstrip(" "))
+        while stack[-1][0] >= indent:
+            stack.pop()
+        block = stack[-1][1].add(stripped)
+        stack.append((indent, block))
+
+        if stripped.startswith("banner "):
+            delimiter = _banner_delimiter(stripped)
+            if delimiter and stripped.count(delimiter) < 2:
+                text_end = delimiter
+        elif stripped.startswith("certificate ") and len(stack) > 2 and \
+                stack[-2][1].line.startswith("crypto pki certificate chain "):
+            text_end = "quit"
+        if text_end is not None:
+            text_block = block
+            block.text = []
+
+    return root
+
+
+def _banner_delimiter(line):
+    # "banner motd ^C" / "banner login #text#": the delimiter follows the banner type
+    parts = line.split(None, 2)
+    if len(parts) < 3:
+        return None
+    rest = parts[2]
+    if rest.startswith("^C"):
+        return "^C"
+    return rest[0]
+
+
+def diff_configs(old, new, path=()):
+    # Sections only in old come out as "-", only in new as "+", each once at the
+    # highest level where they differ; shared sections are compared recursively.
+    entries = []
+    old_children = old.children
+    new_children = new.children
+
+    for line, block in old_children.items():
+        if line not in new_children:
+            entries.append(DiffEntry("-", path + (line,), block))
+
+    for line, block in new_children.items():
+        other = old_children.get(line)
+        if other is None:
+            entries.append(DiffEntry("+", path + (line,), block))
+        elif other.text != block.text:
+            # free text has no sections to match up: the whole block changed
+            entries.append(DiffEntry("-", path + (line,), other))
+            entries.append(DiffEntry("+", path + (line,), block))
+        elif other.children or block.children:
+            entries.extend(diff_configs(other, block, path + (line,)))
+
+    return entries
+
+
+def format_diff(entries):
+    output = []
+    context = ()
+    for entry in entries:
+        depth = len(entry.path) - 1
+        parents = entry.path[:-1]
+        # print the enclosing section lines once per run of changes inside them
+        shared = 0
+        while shared < min(len(parents), len(context)) and parents[shared] == context[shared]:
+            shared += 1
+        for parent_depth in range(shared, len(parents)):
+            output.append(f"  {' ' * parent_depth}{parents[parent_depth]}")
+        context = parents
+        output.append(f"{entry.op} {' ' * depth}{entry.path[-1]}")
+        for child_depth, line in entry.block.lines(depth + 1):
+            output.append(f"{entry.op} {' ' * child_depth}{line}")
+    return "\n".join(output)
+
+
+# Commands that hold a single value: a new value replaces the old one, so the old
+# line doesn't need a "no" form first
+SINGLE_VALUE_PREFIXES = ("hostname ", "description ", "ip domain name ", "ip address ", "duplex ",
+                         "speed ", "mtu ", "bandwidth ", "encapsulation ", "router-id ")
+
+
+def _superseded(line, added):
+    if line.endswith(" secondary"):
+        return False
+    for prefix in SINGLE_VALUE_PREFIXES:
+        if line.startswith(prefix):
+            return any(new.startswith(prefix) or new == f"no {prefix.strip()}" for new in added)
+    return False
+
+
+def _negate(line):
+    return line[3:] if line.startswith("no ") else f"no {line}"
+
+
+def _remove_section(line):
+    # physical interfaces can't be deleted, only reset to defaults
+    if line.startswith("interface ") and not line.split()[1].startswith(("Loopback", "Tunnel", "Vlan")) \
+            and "." not in line:
+        return f"default {line}"
+    return _negate(line)
+
+
+# Sections whose lines are evaluated in order (first match wins): any change is
+# applied by removing the section and writing it out again in target's order
+ORDERED_SECTIONS = ("ip access-list ", "ipv6 access-list ", "mac access-list ", "route-map ")
+
+# Top-level lines that form ordered lists, and how many words name the list
+ORDERED_LINES = (("access-list ", 2), ("ip prefix-list ", 3), ("ipv6 prefix-list ", 3))
+
+BANNER_DELIMITERS = "^#%@~$&|"
+
+
+def ordered_list(line):
+    for prefix, words in ORDERED_LINES:
+        if line.startswith(prefix):
+            return " ".join(line.split()[:words])
+    return None
+
+
+def _ordered_lists(block):
+    lists = {}
+    for line in block.children:
+        name = ordered_list(line)
+        if name:
+            lists.setdefault(name, []).append(line)
+    return lists
+
+
+def _banner_type(line):
+    return line.split()[1] if len(line.split()) > 1 else ""
+
+
+def _banner_commands(block):
+    # The whole banner, re-delimited with a character its text doesn't contain: the
+    # "^C" that show running-config prints stands for Ctrl-C, which can't be typed
+    # back, and a banner sent without its closing delimiter swallows what follows.
+    header = block.line
+    delimiter = _banner_delimiter(header)
+    text = "\n".join([header.split(None, 2)[2]] + (block.text or []))
+    body = text[len(delimiter):]
+    if delimiter in body:
+        body = body[:body.rindex(delimiter)]
+    new = next((c for c in BANNER_DELIMITERS if c not in body), None)
+    if new is None:
+        raise ValueError(f"No delimiter left for {header!r}")
+    return f"banner {_banner_type(header)} {new}{body}{new}".split("\n")
+
+
+def config_delta(running, target):
+    # Commands that take running to target: removals first (so a replaced single-value
+    # line like "ip address" is cleared before the new one goes in), then additions,
+    # descending into sections present on both sides. Sections are closed with "exit".
+    # Banners and ordered lists (ACLs, route-maps, prefix-lists) are replaced whole.
+    commands = []
+    added = [line for line in target.children if line not in running.children]
+    running_lists = _ordered_lists(running)
+    target_lists = _ordered_lists(target)
+    replaced = {name for name, lines in target_lists.items() if running_lists.get(name) != lines}
+    banners = {_banner_type(line) for line in target.children if line.startswith("banner ")}
+
+    for name in running_lists:
+        if name not in target_lists or name in replaced:
+            commands.append(f"no {name}")
+
+    for line, block in running.children.items():
+        if line in target.children or ordered_list(line):
+            continue
+        if line.startswith("banner "):
+            # a banner of the same type in target overwrites this one
+            if _banner_type(line) not in banners:
+                commands.append(f"no banner {_banner_type(line)}")
+            continue
+        if block.children:
+            commands.append(_remove_section(line))
+            continue
+        negated = _negate(line)
+        # "no shutdown" -> "shutdown" is itself being added, and "no ip address" is
+        # superseded by whichever "ip address ..." replaces it
+        if negated in added or any(new.startswith(negated + " ") for new in added):
+            continue
+        if _superseded(line, added):
+            continue
+        commands.append(negated)
+
+    for line, block in target.children.items():
+        other = running.children.get(line)
+        name = ordered_list(line)
+        if name:
+            if name in replaced:
+                commands.extend(target_lists[name])
+                replaced.discard(name)
+        elif line.startswith("banner "):
+            if other is None or list(other.lines()) != list(block.lines()):
+                commands.extend(_banner_commands(block))
+        elif other is None:
+            commands.append(line)
+            if block.text is not None:
+                commands.extend(block.text)
+            elif block.children:
+                commands.extend(_section_commands(block))
+                commands.append("exit")
+        elif other.text != block.text:
+            commands.append(_negate(line))
+            commands.append(line)
+            commands.extend(block.text or [])
+        elif line.startswith(ORDERED_SECTIONS):
+            if list(other.lines()) != list(block.lines()):
+                commands.append(_negate(line))
+                commands.append(line)
+                commands.extend(_section_commands(block))
+                commands.append("exit")
+        elif block.children or other.children:
+            nested = config_delta(other, block)
+            if nested:
+                commands.append(line)
+                commands.extend(nested)
+                commands.append("exit")
+
+    return commands
+
+
+def _section_commands(block):
+    commands = []
+    for line, child in block.children.items():
+        commands.append(line)
+        if child.text is not None:
+            commands.extend(child.text)
+        elif child.children:
+            commands.extend(_section_commands(child))
+            commands.append("exit")
+    return commands
@@ -0,0 +1,165 @@
+import bisect
+import hashlib
+import os
+import threading
+import time
+import zlib
+
+# Chunks close after a top-level "!" separator, so each chunk is roughly one config
+# section and an edit to one section leaves every other chunk's hash unchanged
+MAX_CHUNK_BYTES = 64 * 1024
+
+
+def archive_path():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.abspath(os.path.join(base_dir, "..", "configuration", "archive"))
+
+
+def split_chunks(text):
+    # text is a string or any iterable of lines, such as an open file
+    lines = text.splitlines(keepends=True) if isinstance(text, str) else text
+    current = []
+    size = 0
+    for line in lines:
+        current.append(line)
+        size += len(line)
+        if line.rstrip("\r\n") == "!" or size >= MAX_CHUNK_BYTES:
+            yield "".join(current)
+            current = []
+            size = 0
+    if current:
+        yield "".join(current)
+
+
+# Local history of device configs. Every config is cut into section chunks stored
+# once each by SHA-256 under objects/ (zlib-compressed), and a snapshot is just the
+# list of its chunk hashes, itself stored the same way. A device's index/<name>.log
+# gets a "<unix time> <snapshot hash>" line only when its config actually changed,
+# so daily backups of an unchanged fleet add nothing to disk.
+class ConfigStore:
+    def __init__(self, root=None, level=9):
+        self.root = root or archive_path()
+        self.level = level
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def _index_path(self, device_name):
+        return os.path.join(self.root, "index", f"{device_name}.log")
+
+    def _write_object(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(data, self.level))
+            os.replace(tmp_path, path)
+        return digest
+
+    def _read_object(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def history(self, device_name):
+        with self._lock:
+            entries = self._history.get(device_name)
+            if entries is None:
+                entries = []
+                try:
+                    with open(self._index_path(device_name), 'r') as f:
+                        for line in f:
+                            timestamp, digest = line.split()
+                            entries.append((float(timestamp), digest))
+                except FileNotFoundError:
+                    pass
+                self._history[device_name] = entries
+            return list(entries)
+
+    def put(self, device_name, text, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        # text may be an open file; only one chunk at a time is held in memory
+        chunk_hashes = [self._write_object(chunk.encode()) for chunk in split_chunks(text)]
+        snapshot = self._write_object("\n".join(chunk_hashes).encode())
+
+        entries = self.history(device_name)
+        if entries and entries[-1][1] == snapshot:
+            return snapshot
+
+        os.makedirs(os.path.dirname(self._index_path(device_name)), exist_ok=True)
+        with self._lock:
+            with open(self._index_path(device_name), 'a') as f:
+                f.write(f"{timestamp:.3f} {snapshot}\n")
+            self._history[device_name].append((timestamp, snapshot))
+        return snapshot
+
+    def snapshot_at(self, device_name, at=None):
+        entries = self.history(device_name)
+        if not entries:
+            return None
+        if at is None:
+            return entries[-1][1]
+        position = bisect.bisect_right([timestamp for timestamp, _ in entries], at)
+        return entries[position - 1][1] if position else None
+
+    def read_snapshot(self, snapshot):
+        manifest = self._read_object(snapshot).decode()
+        return "".join(self._read_object(digest).decode() for digest in manifest.split("\n") if digest)
+
+    def get(self, device_name, at=None):
+        # the config as it was at unix time `at` (latest when omitted), or None
+        snapshot = self.snapshot_at(device_name, at)
+        return self.read_snapshot(snapshot) if snapshot else None
+
+    def devices(self):
+        try:
+            return sorted(name[:-4] for name in os.listdir(os.path.join(self.root, "index"))
+                          if name.endswith(".log"))
+        except FileNotFoundError:
+            return []
+
+    def prune(self, keep_last=None, older_than=None):
+        # Drops history entries beyond the newest keep_last per device and/or older
+        # than unix time older_than (the newest entry always stays), then deletes
+        # objects no remaining snapshot references. Returns the number of objects freed.
+        if keep_last is not None and keep_last < 1:
+            raise ValueError(f"keep_last must be at least 1, got {keep_last}")
+        live = set()
+        for name in self.devices():
+            entries = self.history(name)
+            kept = entries
+            if older_than is not None:
+                kept = [e for e in kept if e[0] >= older_than] or kept[-1:]
+            if keep_last is not None:
+                kept = kept[-keep_last:]
+            if len(kept) != len(entries):
+                path = self._index_path(name)
+                with self._lock:
+                    with open(path + ".tmp", 'w') as f:
+                        f.writelines(f"{timestamp:.3f} {digest}\n" for timestamp, digest in kept)
+                    os.replace(path + ".tmp", path)
+                    self._history[name] = kept
+            for _, snapshot in kept:
+                live.add(snapshot)
+                live.update(d for d in self._read_object(snapshot).decode().split("\n") if d)
+
+        freed = 0
+        objects_dir = os.path.join(self.root, "objects")
+        for prefix in os.listdir(objects_dir) if os.path.isdir(objects_dir) else []:
+            for rest in os.listdir(os.path.join(objects_dir, prefix)):
+                if prefix + rest not in live and not rest.endswith(".tmp"):
+                    os.remove(os.path.join(objects_dir, prefix, rest))
+                    freed += 1
+        return freed
+
+    def disk_usage(self):
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        return total
+
+
+store = ConfigStore()
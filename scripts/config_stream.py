@@ -0,0 +1,116 @@
+import hashlib
+import os
+import sys
+import time
+
+
+class FileSink:
+    # Writes to <path>.tmp and only moves it over path once the stream completed;
+    # an identical result leaves the existing file (and its mtime) untouched
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.file = open(self.tmp_path, 'w')
+
+    def write(self, text):
+        self.file.write(text)
+
+    def commit(self, checksum):
+        self.file.close()
+        if os.path.exists(self.path) and file_checksum(self.path) == checksum:
+            os.remove(self.tmp_path)
+            return False
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class TerminalSink:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def commit(self, checksum):
+        return True
+
+    def abort(self):
+        pass
+
+
+def file_checksum(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stream_command(connection, command, sink, read_timeout=120, poll_interval=0.05):
+    # Sends command on an open netmiko session and hands the output to sink as it
+    # arrives instead of collecting it into one string. The echoed command and the
+    # trailing prompt are stripped, line endings normalised to \n, and a SHA-256 of
+    # exactly what the sink received is returned together with its length.
+    digest = hashlib.sha256()
+    written = 0
+    pending = ""
+    echo_stripped = False
+
+    def emit(text):
+        nonlocal written
+        if text:
+            sink.write(text)
+            digest.update(text.encode())
+            written += len(text)
+
+    try:
+        # inside the try: a dead channel fails here, and the sink's temp file must go too
+        prompt = connection.find_prompt()
+        connection.write_channel(command + connection.RETURN)
+        deadline = time.monotonic() + read_timeout
+        # enough of the tail is held back that the prompt is never emitted
+        holdback = len(prompt) + 2
+
+        while True:
+            chunk = connection.read_channel()
+            if not chunk:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No prompt after {read_timeout}s running {command!r}")
+                time.sleep(poll_interval)
+                continue
+            deadline = time.monotonic() + read_timeout
+            pending = (pending + chunk).replace("\r\n", "\n")
+
+            if not echo_stripped:
+                if "\n" not in pending:
+                    continue
+                first, _, rest = pending.partition("\n")
+                pending = rest if command in first else pending
+                echo_stripped = True
+
+            if pending.rstrip().endswith(prompt):
+                emit(pending.rstrip()[:-len(prompt)])
+                break
+
+            cut = len(pending) - holdback
+            if cut > 0:
+                # don't split a \r\n pair across two chunks
+                if pending[cut - 1] == "\r":
+                    cut -= 1
+                emit(pending[:cut])
+                pending = pending[cut:]
+    except BaseException:
+        sink.abort()
+        raise
+
+    checksum = digest.hexdigest()
+    sink.commit(checksum)
+    return checksum, written
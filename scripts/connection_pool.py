@@ -0,0 +1,187 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+
+def netmiko_params(device, **extra):
+    params = {
+        'device_type': device['device_type'],
+        'host': device['hostname'],
+        'username': device['username'],
+        'password': device['password'],
+        'secret': device['secret']
+    }
+    params.update(extra)
+    return params
+
+
+class PooledSession:
+    def __init__(self, connection):
+        self.connection = connection
+        self.key = None
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+    def is_alive(self):
+        try:
+            return self.connection.is_alive()
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            self.connection.disconnect()
+        except Exception:
+            pass
+
+
+def _close(sessions):
+    for session in sessions:
+        session.close()
+
+
+# Enabled netmiko sessions kept open between actions, keyed by device name and the
+# extra netmiko arguments they were opened with (session_log, conn_timeout, ...), so
+# a checkout only reuses a session opened the way the caller asked for.
+# Idle sessions are health-checked on checkout and reopened if the channel died,
+# sessions unused for longer than idle_timeout are dropped, and at most
+# max_sessions sessions are open per device at once.
+class ConnectionPool:
+    def __init__(self, max_sessions=2, idle_timeout=300, keepalive=30, checkout_timeout=60):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self.checkout_timeout = checkout_timeout
+        self._idle = {}
+        self._open = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def _connect(self, device, **extra):
+        # netmiko drags in paramiko and cryptography; only pay for that on the first SSH session
+        from netmiko import ConnectHandler
+
+        connection = ConnectHandler(**netmiko_params(device, keepalive=self.keepalive, **extra))
+        connection.enable()
+        return PooledSession(connection)
+
+    # The helpers below run under the lock and only take sessions out of the pool;
+    # callers disconnect them after releasing it, since that waits on the network
+    # and every other device's checkouts would wait behind it.
+    def _drop(self, key, session, closing):
+        self._idle[key].remove(session)
+        self._open[key[0]] -= 1
+        closing.append(session)
+
+    def _evict_idle(self, now, closing):
+        for key, sessions in self._idle.items():
+            for session in [s for s in sessions if now - s.last_used > self.idle_timeout]:
+                self._drop(key, session, closing)
+
+    def _evict_other(self, name, key, closing):
+        # frees a slot held by an idle session of the same device opened with other extras
+        for other, sessions in self._idle.items():
+            if other[0] == name and other != key and sessions:
+                self._drop(other, sessions[0], closing)
+                return True
+        return False
+
+    def acquire(self, device, **extra):
+        name = device['name']
+        key = (name, tuple(sorted(extra.items())))
+        deadline = time.monotonic() + self.checkout_timeout
+        closing = []
+
+        try:
+            with self._lock:
+                self._evict_idle(time.monotonic(), closing)
+                while True:
+                    idle = self._idle.setdefault(key, [])
+                    if idle:
+                        session = idle.pop()
+                        break
+                    if self._open.get(name, 0) < self.max_sessions or self._evict_other(name, key, closing):
+                        self._open[name] = self._open.get(name, 0) + 1
+                        session = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No free session for {name} after {self.checkout_timeout}s")
+                    self._released.wait(remaining)
+        finally:
+            _close(closing)
+
+        if session is not None and session.is_alive():
+            session.key = key
+            return session
+
+        if session is not None:
+            session.close()
+        try:
+            session = self._connect(device, **extra)
+        except Exception:
+            with self._lock:
+                self._open[name] -= 1
+                self._released.notify()
+            raise
+        session.key = key
+        return session
+
+    def release(self, device, session, discard=False):
+        name = device['name']
+        closing = []
+        with self._lock:
+            now = time.monotonic()
+            if discard:
+                self._open[name] -= 1
+                closing.append(session)
+            else:
+                session.last_used = now
+                self._idle.setdefault(session.key, []).append(session)
+            self._evict_idle(now, closing)
+            self._released.notify()
+        _close(closing)
+
+    @contextmanager
+    def session(self, device, **extra):
+        # A session the action failed in is closed rather than pooled: it may be
+        # mid-command or still in config mode
+        pooled = self.acquire(device, **extra)
+        discard = False
+        try:
+            yield pooled.connection
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            self.release(device, pooled, discard=discard)
+
+    def run(self, device, action, **extra):
+        # Retry once on a fresh session if the pooled channel dropped mid-command
+        try:
+            with self.session(device, **extra) as connection:
+                return action(connection)
+        except (OSError, EOFError):
+            with self.session(device, **extra) as connection:
+                return action(connection)
+
+    def close(self, name):
+        closing = []
+        with self._lock:
+            for key in [key for key in self._idle if key[0] == name]:
+                for session in self._idle.pop(key):
+                    self._open[name] -= 1
+                    closing.append(session)
+            self._released.notify_all()
+        _close(closing)
+
+    def close_all(self):
+        with self._lock:
+            names = {name for name, _ in self._idle}
+        for name in names:
+            self.close(name)
+
+
+pool = ConnectionPool()
+atexit.register(pool.close_all)
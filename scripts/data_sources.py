@@ -0,0 +1,246 @@
+import ipaddress
+import threading
+import time
+
+from scripts import device_mgmt
+from scripts.show_parsers import show_records
+
+# One entry point for the facts the tools read from devices, whichever transport
+# answers best. Each logical query (interfaces, routes, addresses, protocols) has an
+# SNMP source (the device_mgmt table walks) and an SSH source (a parsed show
+# command), both returning the same record shape. Per device and query the router
+# tries sources cheapest first, where cost is the measured latency (an EWMA of
+# successful calls) or a prior until there is a measurement, and a source that just
+# failed sits out a cooldown that doubles while it keeps failing. When every source
+# fails, one error naming each of them is raised; an incomplete SNMP walk counts as
+# a failure but is still returned if nothing better comes back.
+
+# seconds a source is assumed to take before it has been measured; SNMP goes first
+PRIORS = {'snmp': 0.5, 'ssh': 3.0}
+
+# most seconds a source gets per request while the router picks one, whatever the
+# caller's (SSH-sized) timeout: an agent that is off must not hold up the fallback.
+# An SNMP timeout bounds each request, not the whole walk, so big tables still fit.
+BUDGETS = {'snmp': 3}
+
+# first letter of a "show ip route" code -> the name protocol_table gives ipCidrRouteProto
+ROUTE_CODES = {
+    "L": "local",
+    "C": "local",
+    "S": "netmgmt",
+    "R": "rip",
+    "O": "ospf",
+    "B": "bgp",
+    "D": "ciscoEigrp",
+    "i": "is-is",
+    "E": "egp",
+}
+
+
+def _mask(length):
+    return str(ipaddress.IPv4Network(f"0.0.0.0/{length}").netmask)
+
+
+def ssh_interfaces(device, timeout):
+    return [
+        {'interface': r.interface, 'admin': "down" if r.status in ("administratively down", "deleted") else "up",
+         'oper': r.protocol}
+        for r in show_records(device, "show ip interface brief", read_timeout=timeout)
+    ]
+
+
+def ssh_routes(device, timeout):
+    return [
+        {'destination': r.prefix, 'mask': _mask(r.length), 'next_hop': r.next_hop or "0.0.0.0"}
+        for r in show_records(device, "show ip route", read_timeout=timeout)
+    ]
+
+
+def ssh_addresses(device, timeout):
+    return [
+        {'address': r.address, 'mask': _mask(r.length), 'interface': r.interface}
+        for r in show_records(device, "show ip interface", read_timeout=timeout)
+    ]
+
+
+def ssh_protocols(device, timeout):
+    # route keyed like an ipCidrRouteTable index (dest.mask.tos.next-hop), as over SNMP
+    return [
+        {'route': f"{r.prefix}.{_mask(r.length)}.0.{r.next_hop or '0.0.0.0'}",
+         'protocol': ROUTE_CODES.get(r.protocol[:1], f"Unknown ({r.protocol})")}
+        for r in show_records(device, "show ip route", read_timeout=timeout)
+    ]
+
+
+def snmp_protocols(device, timeout):
+    routes, _ = device_mgmt.protocol_table(device, timeout)
+    return routes
+
+
+# query -> {source name: function(device, timeout) returning records}
+SOURCES = {
+    "interfaces": {'snmp': device_mgmt.interface_status, 'ssh': ssh_interfaces},
+    "routes": {'snmp': device_mgmt.route_table, 'ssh': ssh_routes},
+    "addresses": {'snmp': device_mgmt.address_table, 'ssh': ssh_addresses},
+    "protocols": {'snmp': snmp_protocols, 'ssh': ssh_protocols},
+}
+
+QUERIES = tuple(SOURCES)
+
+
+def compare_sources(device, query, timeout=60, sources=None):
+    # Reads query from every source of one device and reports what each returned that
+    # the others didn't. Sources must agree before the router may pick either, or the
+    # cheapest one changes the answer rather than just the latency.
+    # Returns {source: records only it returned}, all empty when they agree.
+    sources = (sources or SOURCES)[query]
+    seen = {}
+    for name, fetch in sources.items():
+        seen[name] = {tuple(sorted(record.items())) for record in fetch(device, timeout)}
+    return {
+        name: [dict(record) for record in sorted(records - set().union(*(seen[o] for o in seen if o != name)))]
+        for name, records in seen.items()
+    }
+
+
+# What the router knows about one source for one device and query
+class SourceStats:
+    __slots__ = ("calls", "failures", "average", "last", "measured_at", "error", "down_until", "cooldown")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.average = None
+        self.last = None
+        self.measured_at = None
+        self.error = None
+        self.down_until = 0.0
+        self.cooldown = 0.0
+
+
+class DataRouter:
+    def __init__(self, sources=None, priors=None, budgets=None, alpha=0.3, cooldown=30, max_cooldown=600,
+                 stale_after=900):
+        self.sources = sources or SOURCES
+        self.priors = priors or PRIORS
+        self.budgets = BUDGETS if budgets is None else budgets
+        self.alpha = alpha
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.stale_after = stale_after
+        self._stats = {}
+        self._chosen = {}
+        self._lock = threading.Lock()
+
+    def _get(self, device, query, source):
+        key = (device['name'], query, source)
+        if key not in self._stats:
+            self._stats[key] = SourceStats()
+        return self._stats[key]
+
+    def cost(self, stats, source, now):
+        # a measurement that hasn't been refreshed for a while falls back to the prior,
+        # so a source that was slow once gets tried again eventually
+        if stats.average is None or now - stats.measured_at > self.stale_after:
+            return self.priors.get(source, 1.0)
+        return stats.average
+
+    def ranked(self, device, query):
+        # Source names in the order they'll be tried: available ones by cost, then the
+        # ones cooling down, soonest back first. An inventory 'sources' list limits
+        # which transports a device may use (e.g. [ssh] for a box without SNMP).
+        if query not in self.sources:
+            raise ValueError(f"Unknown query {query!r}; expected one of {', '.join(self.sources)}")
+        allowed = [s for s in self.sources[query] if s in device.get('sources', self.sources[query])]
+        now = time.monotonic()
+        with self._lock:
+            stats = {source: self._get(device, query, source) for source in allowed}
+            available = sorted((s for s in allowed if stats[s].down_until <= now),
+                               key=lambda s: self.cost(stats[s], s, now))
+            cooling = sorted((s for s in allowed if stats[s].down_until > now),
+                             key=lambda s: stats[s].down_until)
+        return available + cooling
+
+    def _success(self, device, query, source, seconds):
+        with self._lock:
+            stats = self._get(device, query, source)
+            stats.calls += 1
+            stats.last = seconds
+            fresh = stats.average is None or time.monotonic() - stats.measured_at > self.stale_after
+            stats.average = seconds if fresh else self.alpha * seconds + (1 - self.alpha) * stats.average
+            stats.measured_at = time.monotonic()
+            stats.error = None
+            stats.down_until = 0.0
+            stats.cooldown = 0.0
+
+    def _failure(self, device, query, source, seconds, error):
+        with self._lock:
+            stats = self._get(device, query, source)
+            stats.calls += 1
+            stats.failures += 1
+            stats.last = seconds
+            stats.error = error
+            stats.cooldown = min(self.max_cooldown, stats.cooldown * 2 or self.base_cooldown)
+            stats.down_until = time.monotonic() + stats.cooldown
+
+    def fetch(self, device, query, timeout=60, source=None):
+        # (records, source name) for query on device; source forces one transport, which
+        # then gets the whole timeout rather than its budget
+        if source and source not in self.sources.get(query, {}):
+            raise ValueError(f"No {source!r} source for {query!r}")
+        order = [source] if source else self.ranked(device, query)
+        fallback = None
+        errors = []
+        for name in order:
+            started = time.monotonic()
+            try:
+                budget = timeout if source else min(timeout, self.budgets.get(name, timeout))
+                records = self.sources[query][name](device, budget)
+            except Exception as e:
+                self._failure(device, query, name, time.monotonic() - started, str(e))
+                errors.append(f"{name}: {e}")
+                continue
+            seconds = time.monotonic() - started
+            if getattr(records, 'partial', False):
+                self._failure(device, query, name, seconds, "incomplete walk")
+                errors.append(f"{name}: incomplete walk")
+                fallback = fallback or (records, name)
+                continue
+            self._success(device, query, name, seconds)
+            with self._lock:
+                self._chosen[(device['name'], query)] = name
+            return records, name
+        if fallback:
+            return fallback
+        raise RuntimeError(f"No source answered {query} for {device['name']}: " + "; ".join(errors))
+
+    def metrics(self):
+        # one row per (device, query, source) seen so far, with latencies in ms
+        now = time.monotonic()
+        rows = []
+        with self._lock:
+            for (name, query, source), stats in sorted(self._stats.items()):
+                rows.append({
+                    'device': name,
+                    'query': query,
+                    'source': source,
+                    'chosen': self._chosen.get((name, query)) == source,
+                    'state': "down" if stats.down_until > now else "up",
+                    'calls': stats.calls,
+                    'failures': stats.failures,
+                    'avg_ms': None if stats.average is None else round(stats.average * 1000, 1),
+                    'last_ms': None if stats.last is None else round(stats.last * 1000, 1),
+                    'cost_ms': round(self.cost(stats, source, now) * 1000, 1),
+                    'error': stats.error,
+                })
+        return rows
+
+    def reset(self, name=None):
+        with self._lock:
+            for key in [k for k in self._stats if name is None or k[0] == name]:
+                del self._stats[key]
+            for key in [k for k in self._chosen if name is None or k[0] == name]:
+                del self._chosen[key]
+
+
+router = DataRouter()
@@ -1,7 +1,12 @@
-from netmiko import ConnectHandler
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from scripts.device_mgmt import load_devices
+from scripts.config_parser import ConfigBlock, config_delta, diff_configs, ordered_list, parse_config
+from scripts.connection_pool import pool
 from scripts.device_mgmt import ip_routes
+from scripts.inventory import inventory, load_devices
+from scripts.snmp_cache import cache
 
 
 def submenu():
@@ -16,20 +21,33 @@ def submenu():
     return input("Select what you want to do: ")
 
 
-def connectToDevice(device):
-    try:
-        conn = ConnectHandler(
-            device_type=device['device_type'],
-            host=device['hostname'],
-            username=device['username'],
-            password=device['password'],
-            secret=device['secret']
-        )
-        conn.enable()
-        return conn
-    except Exception as e:
-        print(f"Connection failed: {e}")
-        return None
+def ip_address_commands(intf, ip, mask):
+    return [
+        f"interface {intf}",
+        f"ip address {ip} {mask}",
+        "no shutdown",
+        "exit"
+    ]
+
+
+def hostname_commands(new_hostname):
+    return [f"hostname {new_hostname}"]
+
+
+def default_route_commands(next_hop):
+    return [f"ip route 0.0.0.0 0.0.0.0 {next_hop}"]
+
+
+def static_route_commands(destination, mask, next_hop, delete=False):
+    command = f"ip route {destination} {mask} {next_hop}"
+    return [f"no {command}" if delete else command]
+
+
+def ospf_commands(process_id, network, wildcard, area):
+    return [
+        f"router ospf {process_id}",
+        f"network {network} {wildcard} area {area}"
+    ]
 
 
 def changeIpAddress(device):
@@ -42,25 +60,17 @@ def changeIpAddress(device):
     ip = input("Enter new IP address:").strip()
     mask = input("Enter subnet mask:").strip()
 
-    commands = [
-        f"interface {intf}",
-        f"ip address {ip} {mask}",
-        "no shutdown",
-        "exit"
-    ]
-    applyConfig(device, commands)
+    applyConfig(device, ip_address_commands(intf, ip, mask))
 
 
 def changeHostname(device):
     new_hostname = input("Enter new hostname: ").strip()
-    commands = [f"hostname {new_hostname}"]
-    applyConfig(device, commands)
+    applyConfig(device, hostname_commands(new_hostname))
 
 
 def addDefaultRoute(device):
     next_hop = input("Enter next-hop IP for default route:").strip()
-    command = f"ip route 0.0.0.0 0.0.0.0 {next_hop}"
-    applyConfig(device, [command])
+    applyConfig(device, default_route_commands(next_hop))
 
 
 def changeStaticRoute(device):
@@ -72,15 +82,13 @@ def changeStaticRoute(device):
         destination = input("Enter destination network:").strip()
         mask = input("Enter subnet mask:").strip()
         next_hop = input("Enter next-hop IP address:").strip()
-        command = f"no ip route {destination} {mask} {next_hop}"
-        applyConfig(device, [command])
+        applyConfig(device, static_route_commands(destination, mask, next_hop, delete=True))
 
     if choice == '2':
         destination = input("Enter destination network:").strip()
         mask = input("Enter subnet mask:").strip()
         next_hop = input("Enter next-hop IP address:").strip()
-        command = f"ip route {destination} {mask} {next_hop}"
-        applyConfig(device, [command])
+        applyConfig(device, static_route_commands(destination, mask, next_hop))
 
 
 def configureOSPF(device):
@@ -89,25 +97,169 @@ def configureOSPF(device):
     wildcard = input("Enter wildcard mask: ").strip()
     area = input("Enter area: ").strip()
 
-    commands = [
-        f"router ospf {process_id}",
-        f"network {network} {wildcard} area {area}"
-    ]
-    applyConfig(device, commands)
+    applyConfig(device, ospf_commands(process_id, network, wildcard, area))
 
 
 def applyConfig(device, commands):
-    conn = connectToDevice(device)
-    if not conn:
-        return
-
     try:
-        print(f"\nApplying configuration to {device['hostname']}...\n")
-        output = conn.send_config_set(commands)
+        with pool.session(device) as conn:
+            print(f"\nApplying configuration to {device['hostname']}...\n")
+            output = conn.send_config_set(commands)
         print(output)
-        conn.disconnect()
     except Exception as e:
         print(f"Failed to apply config: {e}")
+    finally:
+        # the change (or a half-applied one) makes anything polled earlier stale
+        cache.invalidate(device['hostname'])
+
+
+class ConfigPushError(Exception):
+    pass
+
+
+# IOS answers a rejected config line with one of these instead of failing the session
+CLI_ERROR_MARKERS = ("% Invalid", "% Incomplete", "% Ambiguous", "% Unknown", "% Bad")
+
+
+def send_config(device, commands, read_timeout=60):
+    try:
+        with pool.session(device, conn_timeout=read_timeout) as conn:
+            output = conn.send_config_set(commands, read_timeout=read_timeout)
+    finally:
+        cache.invalidate(device['hostname'])
+
+    check_output(output)
+    return output
+
+
+def check_output(output):
+    for line in (output or "").splitlines():
+        if line.strip().startswith(CLI_ERROR_MARKERS):
+            raise ConfigPushError(line.strip())
+
+
+def _push_one(device, commands, failures, max_failures, lock, timeout):
+    with lock:
+        if max_failures and failures[0] >= max_failures:
+            return {'device': device['name'], 'status': "skipped", 'output': None,
+                    'error': "failure limit reached", 'seconds': 0.0}
+
+    started = time.monotonic()
+    try:
+        output = send_config(device, commands, read_timeout=timeout)
+        return {'device': device['name'], 'status': "ok", 'output': output,
+                'error': None, 'seconds': time.monotonic() - started}
+    except Exception as e:
+        with lock:
+            failures[0] += 1
+        return {'device': device['name'], 'status': "failed", 'output': None,
+                'error': str(e), 'seconds': time.monotonic() - started}
+
+
+def push_config(devices, commands, max_workers=10, canary=1, wave_size=None, max_failures=1, timeout=60):
+    # Rolls commands out to devices in waves: the first `canary` devices on their own,
+    # then waves of wave_size (default: everything left) with at most max_workers
+    # pushes in flight. Once max_failures devices have failed (0 = never stop), the
+    # devices not yet started are reported as skipped.
+    waves = []
+    if canary:
+        waves.append(devices[:canary])
+    remaining = devices[canary:]
+    step = wave_size or len(remaining) or 1
+    waves.extend(remaining[i:i + step] for i in range(0, len(remaining), step))
+
+    results = []
+    failures = [0]
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for wave in waves:
+            futures = [
+                executor.submit(_push_one, device, commands, failures, max_failures, lock, timeout)
+                for device in wave
+            ]
+            results.extend(future.result() for future in futures)
+    return results
+
+
+def _parallel(action, devices, max_workers):
+    # {name: (result or None, exception or None, seconds)} once every device is done
+    def timed(device):
+        started = time.monotonic()
+        try:
+            return action(device), None, time.monotonic() - started
+        except Exception as e:
+            return None, e, time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {device['name']: executor.submit(timed, device) for device in devices}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def _running_tree(conn, timeout):
+    return parse_config(conn.send_command("show running-config", read_timeout=timeout))
+
+
+def _sections(tree, lines):
+    subset = ConfigBlock(None)
+    # in running-config order, which matters for numbered ACL and prefix-list lines
+    subset.children = {line: block for line, block in tree.children.items() if line in lines}
+    return subset
+
+
+def rollback_config(device, before, timeout=60):
+    # Puts back every top-level section that differs from the snapshot `before`, and
+    # only those; returns the commands sent
+    try:
+        with pool.session(device, conn_timeout=timeout) as conn:
+            after = _running_tree(conn, timeout)
+            touched = {entry.path[0] for entry in diff_configs(before, after)}
+            # a numbered ACL or prefix-list is rewritten whole, so it needs all its lines
+            lists = {ordered_list(line) for line in touched} - {None}
+            touched |= {line for tree in (before, after) for line in tree.children if ordered_list(line) in lists}
+            commands = config_delta(_sections(after, touched), _sections(before, touched))
+            if commands:
+                check_output(conn.send_config_set(commands, read_timeout=timeout))
+            return commands
+    finally:
+        cache.invalidate(device['hostname'])
+
+
+def transact_config(devices, commands, max_workers=10, timeout=60):
+    # All-or-nothing change across devices, e.g. both ends of an OSPF link. Every
+    # phase runs on all devices at once and waits for the slowest before the next:
+    #   1. snapshot each running config (any failure aborts before touching anything)
+    #   2. apply the commands and check the output for CLI errors
+    #   3. if any device failed, roll every device back to its snapshot
+    # so the whole change takes about three times the slowest device, not the sum.
+    names = [device['name'] for device in devices]
+    snapshots = _parallel(lambda device: pool.run(device, lambda conn: _running_tree(conn, timeout),
+                                                  conn_timeout=timeout), devices, max_workers)
+    if any(error for _, error, _ in snapshots.values()):
+        return [
+            {'device': name, 'status': "aborted", 'seconds': snapshots[name][2],
+             'error': f"snapshot failed: {snapshots[name][1]}" if snapshots[name][1] else None}
+            for name in names
+        ]
+
+    applied = _parallel(lambda device: send_config(device, commands, read_timeout=timeout), devices, max_workers)
+    failed = {name for name, (_, error, _) in applied.items() if error}
+    if not failed:
+        return [{'device': name, 'status': "committed", 'error': None,
+                 'seconds': snapshots[name][2] + applied[name][2]} for name in names]
+
+    # a device that failed part-way may hold some of the change too, so it is rolled back as well
+    rolled = _parallel(lambda device: rollback_config(device, snapshots[device['name']][0], timeout),
+                       devices, max_workers)
+    results = []
+    for name in names:
+        error = applied[name][1]
+        status = "failed" if error else "rolled-back"
+        if rolled[name][1]:
+            status = "rollback-failed"
+            error = f"{error}; rollback: {rolled[name][1]}" if error else f"rollback: {rolled[name][1]}"
+        results.append({'device': name, 'status': status, 'error': str(error) if error else None,
+                        'seconds': snapshots[name][2] + applied[name][2] + rolled[name][2]})
+    return results
 
 
 def main():
@@ -119,7 +271,7 @@ def main():
             print(f"- {device['name']}")
 
         target = input("Select a device:").strip()
-        device = next((d for d in devices if d['name'] == target), None)
+        device = inventory.get(target)
         if not device:
             print("Device not found.")
             continue
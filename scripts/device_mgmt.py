@@ -1,116 +1,97 @@
-import os
-import yaml
-from netmiko import ConnectHandler
-from pyasn1.codec.ber import encoder, decoder
-from pysnmp.carrier.asyncio.dgram import udp
-from pysnmp.carrier.asyncio.dispatch import AsyncioDispatcher
-from pysnmp.proto import api
-
-
-def load_devices():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    yaml_path = os.path.join(base_dir, "..", "inventory", "device.yaml")
-
-    with open(yaml_path, 'r') as f:
-        return yaml.safe_load(f)["devices"]
-
-
-def snmp_walk(oid_tuple, ip, community="public"):
-    results = []
-    pMod = api.PROTOCOL_MODULES[api.SNMP_VERSION_1]
-
-    headVars = [pMod.ObjectIdentifier(oid_tuple)]
-
-    reqPDU = pMod.GetNextRequestPDU()
-    pMod.apiPDU.set_defaults(reqPDU)
-    pMod.apiPDU.set_varbinds(reqPDU, [(x, pMod.null) for x in headVars])
-
-    reqMsg = pMod.Message()
-    pMod.apiMessage.set_defaults(reqMsg)
-    pMod.apiMessage.set_community(reqMsg, community)
-    pMod.apiMessage.set_pdu(reqMsg, reqPDU)
-
-    def cbRecvFun(
-            transportDispatcher,
-            transportDomain,
-            transportAddress,
-            wholeMsg,
-            reqPDU=reqPDU,
-            headVars=headVars,
-            oid_tuple=oid_tuple
-    ):
-        while wholeMsg:
-            rspMsg, wholeMsg = decoder.decode(wholeMsg, asn1Spec=pMod.Message())
-            rspPDU = pMod.apiMessage.get_pdu(rspMsg)
-
-            if pMod.apiPDU.get_request_id(reqPDU) == pMod.apiPDU.get_request_id(rspPDU):
-                errorStatus = pMod.apiPDU.get_error_status(rspPDU)
-                if errorStatus and errorStatus != 2:
-                    print(f"Error:{errorStatus}")
-                    raise Exception(errorStatus)
-
-                varBindTable = pMod.apiPDU.get_varbind_table(reqPDU, rspPDU)
-
-                for tableRow in varBindTable:
-                    for name, val in tableRow:
-                        oid_str = name.prettyPrint()
-                        oid_prefix = '.'.join(str(x) for x in oid_tuple)
-                        if oid_str.startswith(oid_prefix):
-                            index = oid_str.replace(oid_prefix + '.', '')
-                            results.append((index, oid_str, val.prettyPrint()))
-                        else:
-                            transportDispatcher.job_finished(1)
-                            return wholeMsg
-
-                for oid, val in varBindTable[-1]:
-                    if not isinstance(val, pMod.Null):
-                        break
-                else:
-                    transportDispatcher.job_finished(1)
-                    continue
-
-                pMod.apiPDU.set_varbinds(
-                    reqPDU, [(x, pMod.null) for x, y in varBindTable[-1]]
-                )
-
-                pMod.apiPDU.set_request_id(reqPDU, pMod.getNextRequestID())
-
-                transportDispatcher.send_message(
-                    encoder.encode(reqMsg), transportDomain, transportAddress
-                )
-
-        return wholeMsg
-
-    transportDispatcher = AsyncioDispatcher()
-    transportDispatcher.register_recv_callback(cbRecvFun)
-    transportDispatcher.register_transport(
-        udp.DOMAIN_NAME, udp.UdpAsyncioTransport().open_client_mode()
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.command_pipeline import show_commands
+from scripts.connection_pool import pool
+from scripts.inventory import inventory, load_devices
+from scripts.snmp_cache import cache
+from scripts.snmp_engine import engine
+
+
+def snmp_walk(oid_tuple, ip, community="public", version="2c", max_repetitions=25, timeout=3, port=161,
+              stats=None):
+    return snmp_walk_columns(
+        [oid_tuple], ip, community, version, max_repetitions, timeout, port, stats
+    )[0]
+
+
+# Rows of a table walk joined by index; partial is set when any column was cut short
+# because the agent stopped answering.
+class TableRows(dict):
+    partial = False
+
+
+# Records built from walked tables; partial carries over from the walk
+class Records(list):
+    partial = False
+
+
+def _join_rows(names, walked):
+    rows = TableRows()
+    rows.partial = any(column.partial for column in walked)
+    for name, column in zip(names, walked):
+        for index, _, value in column:
+            rows.setdefault(index, {})[name] = value
+    return rows
+
+
+def snmp_table(columns, ip, community="public", version="2c", max_repetitions=25, timeout=3, port=161,
+               stats=None):
+    # columns maps a field name to a column OID; every column is requested in the same
+    # PDUs and the rows come back joined by index, in the order the agent returned them
+    names = list(columns)
+    walked = snmp_walk_columns(
+        [columns[name] for name in names], ip, community, version, max_repetitions, timeout, port, stats
     )
-    transportDispatcher.send_message(
-        encoder.encode(reqMsg), udp.DOMAIN_NAME, (ip, 161)
+    return _join_rows(names, walked)
+
+
+def snmp_table_many(columns, targets, community="public", version="2c", max_repetitions=25, timeout=3,
+                    port=161):
+    # Walks the same table on every target (ip or (ip, port)) at once over the shared
+    # engine; a device that failed maps to the exception instead of its rows
+    names = list(columns)
+    walked = engine.walk_many_sync(
+        [columns[name] for name in names], targets, community=community, version=version,
+        max_repetitions=max_repetitions, timeout=timeout, port=port
     )
-    transportDispatcher.job_started(1)
-    transportDispatcher.run_dispatcher(3)
-    transportDispatcher.close_dispatcher()
+    return {
+        target: result if isinstance(result, Exception) else _join_rows(names, result)
+        for target, result in walked.items()
+    }
 
+
+def snmp_walk_columns(oid_tuples, ip, community="public", version="2c", max_repetitions=25, timeout=3,
+                      port=161, stats=None, retries=None, use_cache=True):
+    results = [cache.get(ip, port, oid) if use_cache else None for oid in oid_tuples]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+
+    walked = engine.walk_columns_sync(
+        [oid_tuples[i] for i in missing], ip, community=community, version=version,
+        max_repetitions=max_repetitions, timeout=timeout, port=port, stats=stats, retries=retries
+    )
+    for i, result in zip(missing, walked):
+        results[i] = result
+        if use_cache:
+            cache.put(ip, port, oid_tuples[i], result)
     return results
 
 
+def warn_if_partial(device, *results):
+    if any(result.partial for result in results):
+        # stderr, so a truncated walk doesn't end up inside JSON/CSV output
+        print(f"Warning: {device['hostname']} stopped answering, the table below is incomplete",
+              file=sys.stderr)
+
+
 def manage_device(device, commands):
-    netmiko_dev = {
-        'device_type': device['device_type'],
-        'host': device['hostname'],
-        'username': device['username'],
-        'password': device['password'],
-        'secret': device['secret']
-    }
     try:
-        connection = ConnectHandler(**netmiko_dev)
-        connection.enable()
-        print(f"Connected to {netmiko_dev['host']}")
-        output = connection.send_command(commands)
+        with pool.session(device) as connection:
+            print(f"Connected to {device['hostname']}")
+            output = connection.send_command(commands)
         print(output, "\n\n")
-        connection.disconnect()
 
     except Exception as e:
 
@@ -129,180 +110,189 @@ def submenu():
     return input("\nSelect what you want to do")
 
 
-def int_status(device):
-    int_names = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 2, 2, 1, 2),
-        ip=device['hostname'],
-        community="public"
-    )
-    admin_status = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 2, 2, 1, 7),
+def interface_status(device, timeout=3):
+    interfaces = snmp_table(
+        {
+            'name': (1, 3, 6, 1, 2, 1, 2, 2, 1, 2),
+            'admin': (1, 3, 6, 1, 2, 1, 2, 2, 1, 7),
+            'oper': (1, 3, 6, 1, 2, 1, 2, 2, 1, 8),
+        },
         ip=device['hostname'],
-        community="public"
-    )
-    operating_status = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 2, 2, 1, 8),
-        ip=device['hostname'],
-        community="public"
+        community="public",
+        timeout=timeout,
+        port=device.get('snmp_port', 161)
     )
+    warn_if_partial(device, interfaces)
+
+    records = Records()
+    records.partial = interfaces.partial
+    for idx, row in interfaces.items():
+        if 'name' not in row:
+            continue
+        admin = ("up" if row['admin'] == "1" else "down") if 'admin' in row else "unknown"
+        oper = ("up" if row['oper'] == "1" else "down") if 'oper' in row else "unknown"
+        records.append({'interface': row['name'], 'admin': admin, 'oper': oper})
+    return records
 
-    int_names_dict = {
-        idx: name for idx, _, name in int_names
-    }
-    admin_status_dict = {
-        idx: "up" if status == "1" else "down" for idx, _, status in admin_status
-    }
-    operating_status_dict = {
-        idx: "up" if status == "1" else "down" for idx, _, status in operating_status
-    }
 
+def int_status(device):
     print(f"{'Interface':<20} {'Admin Status':<15} {'Operational Status':<20}")
-    for idx in int_names_dict:
-        admin = admin_status_dict.get(idx, "unknown")
-        oper = operating_status_dict.get(idx, "unknown")
+    for record in interface_status(device):
+        admin, oper = record['admin'], record['oper']
 
         admin_display = f"[{admin}" if admin == "up" else f"{admin}"
         oper_display = f"{oper}" if oper == "up" else f"{oper}"
 
-        print(f"{int_names_dict[idx]:<20} {admin_display:<15} {oper_display:<20}")
+        print(f"{record['interface']:<20} {admin_display:<15} {oper_display:<20}")
 
 
-def ip_routes(device):
-    dest_routes = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 4, 24, 4, 1, 1),
-        ip=device['hostname'],
-        community="public"
-    )
-    masks = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 4, 21, 1, 11),
-        ip=device['hostname'],
-        community="public"
-    )
-    next_hop = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 4, 21, 1, 7),
-        ip=device['hostname'],
-        community="public"
-    )
+# ipCidrRouteTable; its rows are indexed dest.mask.tos.next-hop
+CIDR_ROUTE_DEST = (1, 3, 6, 1, 2, 1, 4, 24, 4, 1, 1)
 
-    dest_routes_dict = {
-        idx: dest for idx, _, dest in dest_routes
-    }
-    mask_dict = {
-        idx: mask for idx, _, mask in masks
-    }
-    next_hop_dict = {
-        idx: hop for idx, _, hop in next_hop
-    }
 
-    print(f"{'Destination':<20} {'Mask':<15} {'Next-hop':<20}")
-    for idx in dest_routes_dict:
-        mask = mask_dict.get(idx, "255.255.255.255")
-        next_hop = next_hop_dict.get(idx, "0.0.0.0")
+def cidr_route(index):
+    # (destination, mask, next hop) from an ipCidrRouteTable row index, or None
+    parts = index.split(".")
+    if len(parts) != 13:
+        return None
+    return ".".join(parts[:4]), ".".join(parts[4:8]), ".".join(parts[9:])
 
-        print(f"{dest_routes_dict[idx]:<20} {mask:<15} {next_hop:<15}")
 
+def route_table(device, timeout=3):
+    # the index carries everything, so walking one column is enough
+    routes = snmp_walk(CIDR_ROUTE_DEST, ip=device['hostname'], community="public",
+                       timeout=timeout, port=device.get('snmp_port', 161))
+    warn_if_partial(device, routes)
 
-def ip_addresses(device):
-    address = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 4, 20, 1, 1),
-        ip=device['hostname'],
-        community="public"
-    )
-    masks = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 4, 20, 1, 3),
-        ip=device['hostname'],
-        community="public"
-    )
-    interfaces = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 4, 20, 1, 2),
-        ip=device['hostname'],
-        community="public"
-    )
-    int_names = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 2, 2, 1, 2),
+    records = Records()
+    records.partial = routes.partial
+    for index, _, _ in routes:
+        route = cidr_route(index)
+        if route:
+            destination, mask, next_hop = route
+            records.append({'destination': destination, 'mask': mask, 'next_hop': next_hop})
+    return records
+
+
+def ip_routes(device):
+    print(f"{'Destination':<20} {'Mask':<15} {'Next-hop':<20}")
+    for record in route_table(device):
+        print(f"{record['destination']:<20} {record['mask']:<15} {record['next_hop']:<15}")
+
+
+def address_table(device, timeout=3):
+    # ipAddrTable is indexed by address and ifTable by ifIndex; both come back in one walk
+    rows = snmp_table(
+        {
+            'address': (1, 3, 6, 1, 2, 1, 4, 20, 1, 1),
+            'mask': (1, 3, 6, 1, 2, 1, 4, 20, 1, 3),
+            'interface': (1, 3, 6, 1, 2, 1, 4, 20, 1, 2),
+            'int_name': (1, 3, 6, 1, 2, 1, 2, 2, 1, 2),
+        },
         ip=device['hostname'],
-        community="public"
+        community="public",
+        timeout=timeout,
+        port=device.get('snmp_port', 161)
     )
+    warn_if_partial(device, rows)
+
+    records = Records()
+    records.partial = rows.partial
+    for idx, row in rows.items():
+        if 'address' not in row:
+            continue
+        interface = row.get('interface', "0.0.0.0")
+        records.append({
+            'address': row['address'],
+            'mask': row.get('mask', "255.255.255.255"),
+            'interface': rows.get(interface, {}).get('int_name', f"Interface {interface}"),
+        })
+    return records
 
-    address_dict = {
-        idx: addr for idx, _, addr in address
-    }
-    mask_dict = {
-        idx: mask for idx, _, mask in masks
-    }
-    int_dict = {
-        idx: x for idx, _, x in interfaces
-    }
-    int_names_dict = {
-        idx: name for idx, _, name in int_names
-    }
 
+def ip_addresses(device):
     print(f"{'Address':<20} {'Mask':<15} {'Interface':<20}")
-    for idx in address_dict:
-        mask = mask_dict.get(idx, "255.255.255.255")
-        interface = int_dict.get(idx, "0.0.0.0")
-        int_name = int_names_dict.get(interface, f"Interface {interface}")
-
-        print(f"{address_dict[idx]:<20} {mask:<15} {int_name:<15}")
-
-
-def ip_protocols(device):
-    commands = "show ip protocols"
-    manage_device(device, commands)
-
-    protocols_snmp = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 2, 1, 4, 24, 4, 1, 5),
+    for record in address_table(device):
+        print(f"{record['address']:<20} {record['mask']:<15} {record['interface']:<15}")
+
+
+PROTOCOL_TYPES = {
+    "1": "other",
+    "2": "local",
+    "3": "netmgmt",
+    "4": "icmp",
+    "5": "egp",
+    "6": "ggp",
+    "7": "hello",
+    "8": "rip",
+    "9": "is-is",
+    "10": "es-is",
+    "11": "ciscoIgrp",
+    "12": "bbnSpfIgp",
+    "13": "ospf",
+    "14": "bgp",
+    "16": "ciscoEigrp"
+}
+
+
+def protocol_table(device, timeout=3):
+    # (route protocols, system log messages) from ipCidrRouteProto and clogHistMsgText
+    protocols_snmp, log_snmp = snmp_walk_columns(
+        [
+            (1, 3, 6, 1, 2, 1, 4, 24, 4, 1, 7),
+            (1, 3, 6, 1, 4, 1, 9, 9, 41, 1, 2, 3, 1, 2),
+        ],
         ip=device['hostname'],
-        community="public"
+        community="public",
+        timeout=timeout,
+        port=device.get('snmp_port', 161)
     )
-    log_snmp = snmp_walk(
-        oid_tuple=(1, 3, 6, 1, 4, 1, 9, 9, 41, 1, 2, 3, 1, 2),
-        ip=device['hostname'],
-        community="public"
+    warn_if_partial(device, protocols_snmp, log_snmp)
+
+    routes = Records(
+        {'route': idx, 'protocol': PROTOCOL_TYPES.get(proto, f"Unknown ({proto})")}
+        for idx, _, proto in protocols_snmp
     )
+    routes.partial = protocols_snmp.partial
+    logs = []
+    for _, _, message in log_snmp:
+        try:
+            if isinstance(message, bytes):
+                message = message.decode('utf-8')
+            logs.append(message)
+        except UnicodeDecodeError:
+            logs.append("[Not decodable message]")
+    return routes, logs
 
-    protocol_types = {
-        "1": "other",
-        "2": "local",
-        "3": "netmgmt",
-        "4": "icmp",
-        "5": "egp",
-        "6": "ggp",
-        "7": "hello",
-        "8": "rip",
-        "9": "is-is",
-        "10": "es-is",
-        "11": "ciscoIgrp",
-        "12": "bbnSpfIgp",
-        "13": "ospf",
-        "14": "bgp"
-    }
 
-    protocols_dict = {
-        idx: protocol_types.get(proto, f"Unknown ({proto})")
-        for idx, _, proto in protocols_snmp
-    }
+def ip_protocols(device):
+    # the SSH command and the SNMP walks are in flight together, so the view takes
+    # as long as the slower of the two rather than both back to back
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        show = executor.submit(show_commands, device, ["show ip protocols"])
+        routes, logs = protocol_table(device)
+        try:
+            output = show.result()["show ip protocols"]
+            print(f"Connected to {device['hostname']}")
+            print(output, "\n\n")
+        except Exception as e:
+            print(f"Failed to connect: {e}")
 
     print("\nROUTING PROTOCOLS")
 
-    if protocols_dict:
+    if routes:
         print(f"{'Route':<40} {'Protocol':<15}")
 
-        for idx, proto in protocols_dict.items():
-            print(f"{idx:<40} {proto:<15}")
+        for record in routes:
+            print(f"{record['route']:<40} {record['protocol']:<15}")
     else:
         print("No routing protocol information available")
 
-    if log_snmp:
+    if logs:
         print("\n\nSYSTEM LOGS")
 
-        for _, _, message in log_snmp:
-            try:
-                if isinstance(message, bytes):
-                    message = message.decode('utf-8')
-                print(message)
-            except:
-                print(f"[Not decodable message]")
+        for message in logs:
+            print(message)
 
 
 def main():
@@ -314,7 +304,7 @@ def main():
             print(f"- {device['name']}")
 
         target = input("Select a router; R1 or R2: ").strip()
-        device = next((d for d in devices if d['name'] == target), None)
+        device = inventory.get(target)
         if not device:
             print("Device not found.")
             return
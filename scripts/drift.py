@@ -0,0 +1,148 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from scripts.config_mgmt import get_config_path
+from scripts.config_parser import parse_config
+from scripts.connection_pool import pool
+from scripts.inventory import inventory
+
+# Lines that change without anyone touching the config
+# (comment lines such as "! Last configuration change at ..." never reach the tree)
+VOLATILE_PREFIXES = ("ntp clock-period",)
+
+# IOS stamps every config change here, so an unchanged marker means an unchanged config
+PROBE_COMMAND = "show running-config | include Last configuration change"
+
+
+def state_dir():
+    return get_config_path(".drift")
+
+
+def section_hashes(tree):
+    hashes = {}
+    for line, block in tree.children.items():
+        if line.startswith(VOLATILE_PREFIXES):
+            continue
+        digest = hashlib.sha1(line.encode())
+        for depth, child in block.lines(1):
+            if child.startswith(VOLATILE_PREFIXES):
+                continue
+            digest.update(f"\n{depth}:{child}".encode())
+        hashes[line] = digest.hexdigest()
+    return hashes
+
+
+def compare_hashes(saved, running):
+    added = [line for line in running if line not in saved]
+    removed = [line for line in saved if line not in running]
+    changed = [line for line, digest in running.items() if line in saved and saved[line] != digest]
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def _load_state(name):
+    try:
+        with open(os.path.join(state_dir(), f"{name}.json"), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(name, state):
+    os.makedirs(state_dir(), exist_ok=True)
+    path = os.path.join(state_dir(), f"{name}.json")
+    with open(path + ".tmp", 'w') as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _backup_hashes(device, state):
+    # the saved config is only re-parsed when the file itself changed
+    path = get_config_path(f"{device['name']}_Backup.cfg")
+    stat = os.stat(path)
+    signature = [stat.st_mtime_ns, stat.st_size]
+    if state.get('backup_signature') == signature:
+        return state['backup_sections'], False
+    with open(path, 'r') as f:
+        hashes = section_hashes(parse_config(f))
+    state['backup_signature'] = signature
+    state['backup_sections'] = hashes
+    return hashes, True
+
+
+def scan_device(device, timeout=60):
+    started = time.monotonic()
+    name = device['name']
+    state = _load_state(name)
+    try:
+        saved, backup_changed = _backup_hashes(device, state)
+
+        with pool.session(device, conn_timeout=timeout) as connection:
+            probe = connection.send_command(PROBE_COMMAND, read_timeout=timeout).strip()
+            cached = bool(probe) and probe == state.get('probe') and not backup_changed \
+                and 'running_sections' in state
+            if not cached:
+                running_text = connection.send_command("show running-config", read_timeout=timeout)
+                state['running_sections'] = section_hashes(parse_config(running_text))
+                state['probe'] = probe
+
+        drift = compare_hashes(saved, state['running_sections'])
+        _save_state(name, state)
+        drifted = any(drift.values())
+        return {'device': name, 'status': "drift" if drifted else "in-sync", 'cached': cached,
+                'drift': drift, 'error': None, 'seconds': time.monotonic() - started}
+    except Exception as e:
+        return {'device': name, 'status': "error", 'cached': False, 'drift': None,
+                'error': str(e), 'seconds': time.monotonic() - started}
+    finally:
+        pool.close(name)
+
+
+def scan(devices, max_workers=20, timeout=60):
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(scan_device, device, timeout) for device in devices]
+        for future in as_completed(futures):
+            results.append(future.result())
+    results.sort(key=lambda r: r['device'])
+    return results
+
+
+def print_drift_report(results):
+    print(f"{'Device':<20} {'Status':<9} {'+':>4} {'-':>4} {'~':>4}  {'Sections'}")
+    for r in results:
+        if r['status'] == "error":
+            print(f"{r['device']:<20} {'error':<9} {'':>4} {'':>4} {'':>4}  {r['error']}")
+            continue
+        drift = r['drift']
+        sections = ", ".join((drift['added'] + drift['removed'] + drift['changed'])[:3])
+        print(f"{r['device']:<20} {r['status']:<9} {len(drift['added']):>4} {len(drift['removed']):>4} "
+              f"{len(drift['changed']):>4}  {sections}")
+
+    drifted = sum(1 for r in results if r['status'] == "drift")
+    errors = sum(1 for r in results if r['status'] == "error")
+    cached = sum(1 for r in results if r['cached'])
+    print(f"\n{drifted} drifted, {errors} unreachable, {len(results) - drifted - errors} in sync "
+          f"({cached} answered from the change marker without a full fetch)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report devices whose running config drifted from their backup")
+    parser.add_argument("--select", help="inventory selector, e.g. 'groups=routers'")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--timeout", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    results = scan(inventory.select(args.select), max_workers=args.workers, timeout=args.timeout)
+    print_drift_report(results)
+    print(f"Finished in {time.monotonic() - started:.1f}s")
+    return 1 if any(r['status'] == "drift" for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
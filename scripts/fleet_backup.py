@@ -0,0 +1,43 @@
+import argparse
+import sys
+import time
+
+from scripts.config_mgmt import backup_all, commit_backups, print_backup_report
+from scripts.inventory import inventory
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Back up the running config of every device in the inventory")
+    parser.add_argument("--workers", type=int, default=20,
+                        help="maximum number of devices backed up at the same time")
+    parser.add_argument("--timeout", type=int, default=60,
+                        help="per-device connect/read timeout in seconds")
+    parser.add_argument("--device", action="append", dest="names",
+                        help="only back up the named device (repeatable)")
+    parser.add_argument("--select",
+                        help="inventory selector, e.g. 'groups=routers AND device_type=cisco_ios'")
+    parser.add_argument("--no-commit", action="store_true",
+                        help="write the backup files without recording them in git")
+    parser.add_argument("--local-only", action="store_true",
+                        help="commit the backups but don't push them")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    devices = inventory.select(args.select, name=args.names)
+
+    started = time.monotonic()
+    results = backup_all(devices, max_workers=args.workers, timeout=args.timeout)
+    print_backup_report(results)
+
+    if not args.no_commit:
+        changed = commit_backups(results, push=not args.local_only)
+        print(f"{len(changed)} changed config(s) committed")
+    print(f"Finished in {time.monotonic() - started:.1f}s")
+
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+
+def repo_root():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.abspath(os.path.join(base_dir, ".."))
+
+
+# Collects the config files written during a run and records them in a single
+# commit (and a single push) instead of one add/commit/push per file.
+class CommitBatcher:
+    def __init__(self, repo_dir=None, push=True, remote=None, branch=None):
+        self.repo_dir = repo_dir or repo_root()
+        self.push = push
+        self.remote = remote
+        self.branch = branch
+        self.paths = {}
+
+    def _git(self, *args):
+        # git's own chatter ("[master 7b0ecfa] ...") is kept off stdout, which may be
+        # carrying JSON or CSV; its errors and push progress still reach stderr
+        return subprocess.run(
+            ["git", "-C", self.repo_dir, *args],
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True
+        )
+
+    def add(self, path):
+        self.paths[os.path.abspath(path)] = None
+
+    def changed_paths(self):
+        if not self.paths:
+            return []
+        result = self._git("status", "--porcelain", "-z", "--", *self.paths)
+        return [
+            os.path.join(self.repo_dir, entry[3:])
+            for entry in result.stdout.split("\0") if entry
+        ]
+
+    def commit(self, message):
+        changed = self.changed_paths()
+        if not changed:
+            print("No configuration changes to commit.", file=sys.stderr)
+            self.paths = {}
+            return []
+
+        self._git("add", "--", *changed)
+        self._git("commit", "-m", message, "--", *changed)
+        if self.push:
+            push_args = ["push"]
+            if self.remote:
+                push_args.append(self.remote)
+                if self.branch:
+                    push_args.append(self.branch)
+            self._git(*push_args)
+
+        self.paths = {}
+        return changed
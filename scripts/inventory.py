@@ -0,0 +1,165 @@
+import os
+import pickle
+import threading
+
+SNAPSHOT_VERSION = 1
+
+
+def inventory_path():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.abspath(os.path.join(base_dir, "..", "inventory", "device.yaml"))
+
+
+# Fields with an index; any other field in a selector is matched by scanning
+INDEXED_FIELDS = ("name", "hostname", "groups", "device_type")
+
+
+# inventory/device.yaml parsed once per change of the file, with indexes by name,
+# hostname, group and device_type. Every access checks the file's mtime and size
+# and reloads only when they moved. The parsed devices and indexes are also pickled
+# to <yaml>.snapshot, so a new process whose YAML hasn't changed skips PyYAML.
+class Inventory:
+    def __init__(self, path=None, snapshot=True):
+        self.path = path or inventory_path()
+        self.snapshot_path = self.path + ".snapshot" if snapshot else None
+        self._signature = None
+        self._devices = []
+        self._index = {field: {} for field in INDEXED_FIELDS}
+        self._lock = threading.Lock()
+
+    def _parse(self):
+        import yaml
+
+        with open(self.path, 'r') as f:
+            # libyaml's loader when PyYAML was built with it, the pure-Python one otherwise
+            return yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))["devices"]
+
+    def _read_snapshot(self, signature):
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return False
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('source') != signature:
+            return False
+        self._devices = snapshot['devices']
+        self._index = snapshot['index']
+        return True
+
+    def _write_snapshot(self, signature):
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'source': signature,
+            'devices': self._devices,
+            'index': self._index,
+        }
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError:
+            # a read-only checkout still works, it just parses YAML every start
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _load(self, signature):
+        if self.snapshot_path and self._read_snapshot(signature):
+            return
+        self._build(self._parse())
+        if self.snapshot_path:
+            self._write_snapshot(signature)
+
+    def _build(self, devices):
+        index = {field: {} for field in INDEXED_FIELDS}
+        for position, device in enumerate(devices):
+            for field in INDEXED_FIELDS:
+                values = device.get(field)
+                if values is None:
+                    continue
+                if not isinstance(values, list):
+                    values = [values]
+                for value in values:
+                    index[field].setdefault(str(value), []).append(position)
+        self._devices = devices
+        self._index = index
+
+    def refresh(self):
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+        with self._lock:
+            if signature != self._signature:
+                self._load(signature)
+                self._signature = signature
+        return True
+
+    @property
+    def devices(self):
+        self.refresh()
+        return self._devices
+
+    def get(self, name):
+        self.refresh()
+        positions = self._index["name"].get(name)
+        return self._devices[positions[0]] if positions else None
+
+    def find_host(self, hostname):
+        self.refresh()
+        positions = self._index["hostname"].get(hostname)
+        return self._devices[positions[0]] if positions else None
+
+    def _match(self, field, value):
+        if field == "group":
+            field = "groups"
+        if field in INDEXED_FIELDS:
+            return set(self._index[field].get(value, ()))
+        matches = set()
+        for position, device in enumerate(self._devices):
+            current = device.get(field)
+            values = current if isinstance(current, list) else [current]
+            if value in (str(v) for v in values):
+                matches.add(position)
+        return matches
+
+    def select(self, selector=None, **fields):
+        # selector: "groups=routers AND device_type=cisco_ios OR name=R9"; AND binds
+        # tighter than OR. Keyword arguments are ANDed onto the result and accept a
+        # single value or a list of alternatives.
+        self.refresh()
+        positions = None
+        if selector:
+            positions = set()
+            for alternative in selector.split(" OR "):
+                matched = None
+                for term in alternative.split(" AND "):
+                    field, _, value = term.strip().partition("=")
+                    if not value:
+                        raise ValueError(f"Bad selector term: {term.strip()!r}")
+                    found = self._match(field.strip(), value.strip())
+                    matched = found if matched is None else matched & found
+                positions |= matched
+
+        for field, wanted in fields.items():
+            if wanted is None:
+                continue
+            if not isinstance(wanted, (list, tuple, set)):
+                wanted = [wanted]
+            found = set()
+            for value in wanted:
+                found |= self._match(field, str(value))
+            positions = found if positions is None else positions & found
+
+        if positions is None:
+            return list(self._devices)
+        return [self._devices[p] for p in sorted(positions)]
+
+
+inventory = Inventory()
+
+
+def load_devices():
+    return inventory.devices
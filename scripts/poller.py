@@ -0,0 +1,291 @@
+import argparse
+import heapq
+import queue
+import random
+import sys
+import time
+
+from scripts.inventory import inventory
+from scripts.route_index import FleetRoutes, routes_from_cidr_index
+try:
+    from scripts import counter_arrays
+except ImportError:
+    # NumPy is optional; without it rates are computed row by row
+    counter_arrays = None
+from scripts.snmp_engine import engine
+from scripts.timeseries import TimeSeriesStore
+
+SYS_UPTIME = (1, 3, 6, 1, 2, 1, 1, 3)
+
+# ifTable/ifXTable columns polled every cycle. The 64-bit HC octet counters are
+# preferred; agents without ifXTable only answer the 32-bit ones.
+INTERFACE_COLUMNS = {
+    'name': (1, 3, 6, 1, 2, 1, 2, 2, 1, 2),
+    'oper': (1, 3, 6, 1, 2, 1, 2, 2, 1, 8),
+    'speed': (1, 3, 6, 1, 2, 1, 2, 2, 1, 5),
+    'high_speed': (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 15),
+    'in_octets': (1, 3, 6, 1, 2, 1, 2, 2, 1, 10),
+    'out_octets': (1, 3, 6, 1, 2, 1, 2, 2, 1, 16),
+    'in_errors': (1, 3, 6, 1, 2, 1, 2, 2, 1, 14),
+    'out_errors': (1, 3, 6, 1, 2, 1, 2, 2, 1, 20),
+    'hc_in_octets': (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 6),
+    'hc_out_octets': (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 10),
+}
+
+ROUTE_DEST = (1, 3, 6, 1, 2, 1, 4, 24, 4, 1, 1)
+
+# (series suffix, counter column, 64-bit column or None, multiplier for the rate)
+RATES = (
+    ("in_bps", 'in_octets', 'hc_in_octets', 8),
+    ("out_bps", 'out_octets', 'hc_out_octets', 8),
+    ("in_errors_ps", 'in_errors', None, 1),
+    ("out_errors_ps", 'out_errors', None, 1),
+)
+
+
+def counter_delta(previous, current, bits):
+    # An SNMP counter only goes up and restarts at 0 after 2**bits - 1, so a
+    # smaller reading means it wrapped (once, if polled often enough)
+    if current >= previous:
+        return current - previous
+    return current + 2 ** bits - previous
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Counters from the last poll of one device, kept only to turn the next poll's
+# counters into rates. Holds one reading per interface, so it never grows.
+class DeviceState:
+    __slots__ = ("timestamp", "uptime", "counters")
+
+    def __init__(self):
+        self.timestamp = None
+        self.uptime = None
+        self.counters = {}
+
+
+def interface_rows(walked):
+    rows = {}
+    for name, column in zip(INTERFACE_COLUMNS, walked):
+        for index, _, value in column:
+            rows.setdefault(index, {})[name] = value
+    return rows
+
+
+def compute_rates(state, timestamp, uptime, rows):
+    # Returns {(interface name, series suffix): per-second rate} and moves state on.
+    # Nothing is reported for the first poll or after the agent restarted (sysUpTime
+    # went backwards), since its counters started again from zero.
+    restarted = state.uptime is not None and uptime is not None and uptime < state.uptime
+    elapsed = None if state.timestamp is None else timestamp - state.timestamp
+    usable = elapsed is not None and elapsed > 0 and not restarted
+
+    rates = {}
+    counters = {}
+    for index, row in rows.items():
+        name = row.get('name', f"ifIndex {index}")
+        for suffix, column, hc_column, scale in RATES:
+            value, bits = (_int(row.get(hc_column)) if hc_column else None), 64
+            if value is None:
+                value, bits = _int(row.get(column)), 32
+            if value is None:
+                continue
+            key = (index, suffix)
+            counters[key] = (value, bits)
+            previous = state.counters.get(key)
+            if usable and previous is not None and previous[1] == bits:
+                rates[(name, suffix)] = counter_delta(previous[0], value, bits) * scale / elapsed
+
+    state.timestamp = timestamp
+    state.uptime = uptime
+    # interfaces that disappeared are dropped instead of piling up
+    state.counters = counters
+    return rates
+
+
+# Polls every device's interface counters (and, every route_every polls, its route
+# table, kept as a lookup index in routes) at a fixed interval, forever. Each device gets a random phase in
+# the interval so the fleet isn't polled in one burst, plus up to +-jitter of the
+# interval per cycle around a base schedule that advances by exactly one interval,
+# so jitter never accumulates into drift.
+# Walks are all in flight at once on the shared SNMP engine and the results are
+# turned into rates and written to the time-series store on the polling thread.
+# The route table is walked on its own, so a large one never delays the counters,
+# and counters are timestamped when their walk completes, not when it is processed.
+class Poller:
+    def __init__(self, devices, store=None, interval=60, jitter=0.1, route_every=5, community="public",
+                 timeout=3, save_every=300, port=161, expire_after=7 * 86400):
+        self.devices = {device['name']: device for device in devices}
+        self.store = store or TimeSeriesStore()
+        self.interval = interval
+        self.jitter = jitter
+        self.route_every = route_every
+        self.community = community
+        self.timeout = timeout
+        self.save_every = save_every
+        self.port = port
+        self.expire_after = expire_after
+        self.states = {name: DeviceState() for name in self.devices}
+        self.snapshots = {}
+        self.utilisation = {}
+        self.routes = FleetRoutes()
+        self.polls = {name: 0 for name in self.devices}
+        self.errors = {name: 0 for name in self.devices}
+        self._results = queue.Queue()
+        self._in_flight = set()
+        self._routes_in_flight = set()
+        self._schedule = []
+
+    def _target(self, device):
+        return device['hostname'], device.get('snmp_port', self.port)
+
+    def _walk(self, name, oids, routes):
+        ip, port = self._target(self.devices[name])
+        future = engine.walk_columns_future(oids, ip, community=self.community, timeout=self.timeout, port=port)
+        # the callback runs on the engine thread as the last response arrives
+        future.add_done_callback(lambda f: self._results.put((name, routes, time.time(), f)))
+
+    def _start_poll(self, name):
+        routes = bool(self.route_every) and self.polls[name] % self.route_every == 0
+        self._in_flight.add(name)
+        self._walk(name, [SYS_UPTIME] + list(INTERFACE_COLUMNS.values()), False)
+        if routes and name not in self._routes_in_flight:
+            self._routes_in_flight.add(name)
+            self._walk(name, [ROUTE_DEST], True)
+
+    def _record(self, name, routes, timestamp, future):
+        if routes:
+            self._record_routes(name, timestamp, future)
+            return
+        self._in_flight.discard(name)
+        self.polls[name] += 1
+        try:
+            walked = future.result()
+        except Exception as e:
+            self.errors[name] += 1
+            print(f"{name}: poll failed: {e}", file=sys.stderr)
+            return
+
+        if any(column.partial for column in walked):
+            # a truncated walk would look like counters going backwards next time
+            self.errors[name] += 1
+            return
+
+        uptime = _int(walked[0][0][2]) if walked[0] else None
+        columns = walked[1:1 + len(INTERFACE_COLUMNS)]
+        if counter_arrays is not None:
+            snapshot = counter_arrays.build_snapshot(timestamp, uptime, dict(zip(INTERFACE_COLUMNS, columns)), RATES)
+            rates = counter_arrays.rate_matrix(self.snapshots.get(name), snapshot, RATES)
+            self.snapshots[name] = snapshot
+            self.utilisation[name] = (snapshot, counter_arrays.utilisation(snapshot, rates))
+            for interface, suffix, rate in counter_arrays.rate_items(snapshot, rates, RATES):
+                self.store.add(name, f"{interface} {suffix}", timestamp, rate)
+            up = int((snapshot.oper == 1).sum())
+        else:
+            rows = interface_rows(columns)
+            for (interface, suffix), rate in compute_rates(self.states[name], timestamp, uptime, rows).items():
+                self.store.add(name, f"{interface} {suffix}", timestamp, rate)
+            up = sum(1 for row in rows.values() if row.get('oper') == "1")
+
+        self.store.add(name, "interfaces_up", timestamp, up)
+
+    def _record_routes(self, name, timestamp, future):
+        self._routes_in_flight.discard(name)
+        try:
+            (column,) = future.result()
+        except Exception as e:
+            self.errors[name] += 1
+            print(f"{name}: route walk failed: {e}", file=sys.stderr)
+            return
+        if column.partial:
+            # a truncated table would withdraw every route past the cut
+            self.errors[name] += 1
+            return
+        self.store.add(name, "routes", timestamp, len(column))
+        self.routes.sync(name, routes_from_cidr_index(column))
+
+    def top_utilisation(self, n=10):
+        # the n busiest interfaces across all devices as of each one's last poll
+        if counter_arrays is None:
+            raise RuntimeError("top_utilisation needs NumPy")
+        return counter_arrays.top_n(self.utilisation, n)
+
+    def _save(self):
+        # series not fed for expire_after belong to interfaces that no longer exist
+        older_than = time.time() - self.expire_after
+        for name in self.devices:
+            self.store.expire(name, older_than)
+        self.store.save_all()
+
+    def run(self, duration=None):
+        if not self.devices:
+            return
+        engine.start()
+        now = time.monotonic()
+        for name in self.devices:
+            base = now + random.uniform(0, self.interval)
+            heapq.heappush(self._schedule, (base, base, name))
+        stop_at = None if duration is None else now + duration
+        next_save = now + self.save_every
+
+        try:
+            while stop_at is None or time.monotonic() < stop_at:
+                due, base, name = self._schedule[0]
+                wait = due - time.monotonic()
+                if stop_at is not None:
+                    wait = min(wait, stop_at - time.monotonic())
+                try:
+                    self._record(*self._results.get(timeout=max(wait, 0)))
+                    continue
+                except queue.Empty:
+                    pass
+
+                if time.monotonic() < due:
+                    continue
+                heapq.heappop(self._schedule)
+                if name in self._in_flight:
+                    # still waiting on the last poll; skip a cycle instead of stacking requests
+                    self.errors[name] += 1
+                else:
+                    self._start_poll(name)
+                # jitter shifts one poll off the base schedule; the base itself moves by exactly one interval
+                base += self.interval
+                offset = random.uniform(-self.jitter, self.jitter) * self.interval
+                heapq.heappush(self._schedule, (base + offset, base, name))
+
+                if time.monotonic() >= next_save:
+                    self._save()
+                    next_save = time.monotonic() + self.save_every
+        finally:
+            self._save()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll interface counters and route tables into local time series")
+    parser.add_argument("--select", help="inventory selector, e.g. 'groups=routers'")
+    parser.add_argument("--interval", type=float, default=60, help="seconds between polls of one device")
+    parser.add_argument("--jitter", type=float, default=0.1, help="random shift per poll, as a fraction of interval")
+    parser.add_argument("--route-every", type=int, default=5, help="walk the route table every N polls (0 = never)")
+    parser.add_argument("--community", default="public")
+    parser.add_argument("--timeout", type=float, default=3)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    args = parser.parse_args(argv)
+
+    poller = Poller(inventory.select(args.select), interval=args.interval, jitter=args.jitter,
+                    route_every=args.route_every, community=args.community, timeout=args.timeout)
+    try:
+        poller.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    failed = sum(poller.errors.values())
+    print(f"{sum(poller.polls.values())} polls of {len(poller.devices)} device(s), {failed} failed or skipped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
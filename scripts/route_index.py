@@ -0,0 +1,236 @@
+import socket
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.data_sources import router
+from scripts.device_mgmt import cidr_route
+
+# Longest-prefix-match over walked IPv4 route tables, small enough to hold full
+# Internet tables (~1M prefixes) for every router in the fleet.
+#
+# A pointer-per-node trie costs well over 100 bytes a prefix in Python, so the
+# index is laid out flat instead: per prefix length, a sorted array('I') of network
+# addresses with a parallel array of next-hop set ids (~8 bytes a prefix), plus
+# bitmaps of which lengths have a prefix covering each /16 (lengths up to 16) and
+# each /20 (longer ones). A lookup probes only those lengths, longest first, with
+# one C-level bisect each: a few probes rather than a walk down 32 levels.
+
+Match = namedtuple("Match", ["prefix", "length", "next_hops"])
+
+MASKS = [(0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF for length in range(33)]
+LENGTHS = {mask: length for length, mask in enumerate(MASKS)}
+
+# above 1/64th of a prefix length's entries changing, its arrays are replaced, not patched
+REBUILD_FRACTION = 64
+
+
+def to_int(address):
+    return struct.unpack("!I", socket.inet_aton(address))[0]
+
+
+def to_str(address):
+    return socket.inet_ntoa(struct.pack("!I", address))
+
+
+def routes_from_records(records):
+    # (network, length, next hop) from route records ({destination, mask, next_hop})
+    # as returned by device_mgmt.route_table (decoded from the ipCidrRouteTable index,
+    # like routes_from_cidr_index) or the data source router
+    for record in records:
+        length = LENGTHS.get(to_int(record['mask']))
+        if length is None:
+            continue  # non-contiguous masks have no prefix length
+        yield to_int(record['destination']) & MASKS[length], length, record['next_hop']
+
+
+def routes_from_cidr_index(column):
+    # (network, length, next hop) from a walked ipCidrRouteTable column: every row's
+    # index is dest.mask.tos.next-hop, so any one column carries the whole table
+    for index, _, _ in column:
+        route = cidr_route(index)
+        if route is None:
+            continue
+        destination, mask, next_hop = route
+        length = LENGTHS.get(to_int(mask))
+        if length is None:
+            continue
+        yield to_int(destination) & MASKS[length], length, next_hop
+
+
+class RouteIndex:
+    def __init__(self):
+        self._networks = [array('I') for _ in range(33)]
+        self._values = [array('I') for _ in range(33)]
+        # lengths 0-16 that cover each /16 (bit = length), 17-32 per /20 (bit = length - 17)
+        self._short = array('I', bytes(4 * (1 << 16)))
+        self._long = array('H', bytes(2 * (1 << 20)))
+        # next-hop sets are interned: a table has few distinct ones. Keys are the next
+        # hop itself, or a sorted tuple for ECMP; _hops always holds tuples.
+        self._hops = []
+        self._keys = []
+        self._hop_ids = {}
+
+    def __len__(self):
+        return sum(len(networks) for networks in self._networks)
+
+    def nbytes(self):
+        arrays = self._networks + self._values + [self._short, self._long]
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    def _hop_id(self, hops):
+        hop_id = self._hop_ids.get(hops)
+        if hop_id is None:
+            hop_id = self._hop_ids[hops] = len(self._hops)
+            self._hops.append(hops if isinstance(hops, tuple) else (hops,))
+            self._keys.append(hops)
+        return hop_id
+
+    def lookup(self, address):
+        # Match for the longest prefix containing address (dotted string or int), or None
+        if isinstance(address, str):
+            address = to_int(address)
+        candidates = self._long[address >> 12] << 17 | self._short[address >> 16]
+        while candidates:
+            length = candidates.bit_length() - 1
+            candidates ^= 1 << length
+            network = address & MASKS[length]
+            networks = self._networks[length]
+            i = bisect_left(networks, network)
+            if i < len(networks) and networks[i] == network:
+                return Match(to_str(network), length, self._hops[self._values[length][i]])
+        return None
+
+    def prefixes(self):
+        # (network, length, next hops) for every prefix, by length then network
+        for length in range(33):
+            for network, value in zip(self._networks[length], self._values[length]):
+                yield network, length, self._hops[value]
+
+    def _buckets(self, length):
+        # (bucket array, bit, bucket shift, buckets one prefix covers)
+        if length <= 16:
+            return self._short, 1 << length, 16, 1 << (16 - length)
+        return self._long, 1 << (length - 17), 12, 1 << max(20 - length, 0)
+
+    def _mark(self, networks, length):
+        buckets, bit, shift, span = self._buckets(length)
+        if span == 1:
+            for network in networks:
+                buckets[network >> shift] |= bit
+            return
+        for network in networks:
+            first = network >> shift
+            for bucket in range(first, first + span):
+                buckets[bucket] |= bit
+
+    def _unmark(self, networks, length, remaining=None):
+        # Prefixes of one length never overlap, so one that spans whole buckets owns
+        # them. A longer one shares its /20 with any same-length prefix still in
+        # remaining (the sorted array after removal), which would sit next to it.
+        buckets, bit, shift, span = self._buckets(length)
+        clear = ~bit & 0xFFFFFFFF
+        for network in networks:
+            first = network >> shift
+            if span == 1 and remaining:
+                i = bisect_left(remaining, network)
+                if (i > 0 and remaining[i - 1] >> shift == first) or \
+                        (i < len(remaining) and remaining[i] >> shift == first):
+                    continue
+            for bucket in range(first, first + span):
+                buckets[bucket] &= clear
+
+    def sync(self, routes):
+        # Makes the index hold exactly routes ((network, length, next hop) tuples, as
+        # from a fresh walk), touching only what changed: lengths with few changes are
+        # patched in place, lengths with many get new arrays, and the bucket bitmaps
+        # are only updated for added and removed prefixes. Returns (added, changed, removed).
+        per_length = [{} for _ in range(33)]
+        for network, length, next_hop in routes:
+            hops = per_length[length].setdefault(network, next_hop)
+            if hops is not next_hop and hops != next_hop and not (isinstance(hops, tuple) and next_hop in hops):
+                per_length[length][network] = tuple(sorted((hops if isinstance(hops, tuple) else (hops,))
+                                                           + (next_hop,)))
+
+        added = changed = removed = 0
+        keys = self._keys
+        for length, target in enumerate(per_length):
+            networks, values = self._networks[length], self._values[length]
+            if not target and not networks:
+                continue
+            # both sides as {network: next-hop key}, so an unchanged length is one C-level compare
+            current = dict(zip(networks, map(keys.__getitem__, values)))
+            if current == target:
+                continue
+            gone = current.keys() - target.keys()
+            updates = {network: hops for network, hops in target.items() if current.get(network) != hops}
+            new = updates.keys() - current.keys()
+            added, changed, removed = added + len(new), changed + len(updates) - len(new), removed + len(gone)
+            for network, hops in updates.items():
+                updates[network] = self._hop_id(hops)
+
+            if len(gone) + len(new) > max(REBUILD_FRACTION, len(networks) // REBUILD_FRACTION):
+                ids = self._hop_ids
+                ordered = sorted(target)
+                networks = self._networks[length] = array('I', ordered)
+                self._values[length] = array('I', map(ids.__getitem__, map(target.__getitem__, ordered)))
+            else:
+                for network in gone:
+                    i = bisect_left(networks, network)
+                    del networks[i]
+                    del values[i]
+                for network, hop_id in updates.items():
+                    i = bisect_left(networks, network)
+                    if network in new:
+                        networks.insert(i, network)
+                        values.insert(i, hop_id)
+                    else:
+                        values[i] = hop_id
+            self._unmark(gone, length, networks)
+            self._mark(new, length)
+        return added, changed, removed
+
+
+# One RouteIndex per device, for "where does this address go on every router"
+class FleetRoutes:
+    def __init__(self):
+        self.indexes = {}
+
+    def sync(self, name, routes):
+        return self.indexes.setdefault(name, RouteIndex()).sync(routes)
+
+    def drop(self, name):
+        self.indexes.pop(name, None)
+
+    def lookup(self, address):
+        # {device name: Match or None}
+        if isinstance(address, str):
+            address = to_int(address)
+        return {name: index.lookup(address) for name, index in self.indexes.items()}
+
+    def refresh(self, devices, max_workers=10, timeout=60):
+        # Re-reads each device's table (SNMP or SSH, through the data source router) and
+        # syncs its index; one result dict per device
+        def fetch(device):
+            started = time.monotonic()
+            try:
+                records, source = router.fetch(device, "routes", timeout)
+                return device, records, source, None, time.monotonic() - started
+            except Exception as e:
+                return device, None, None, str(e), time.monotonic() - started
+
+        results = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for device, records, source, error, seconds in executor.map(fetch, devices):
+                result = {'device': device['name'], 'status': "error" if error else "ok",
+                          'seconds': seconds, 'error': error, 'source': source}
+                if not error:
+                    # applied on this thread, so indexes are never written concurrently
+                    added, changed, removed = self.sync(device['name'], routes_from_records(records))
+                    result.update(routes=len(self.indexes[device['name']]), added=added, changed=changed,
+                                  removed=removed)
+                results.append(result)
+        return results
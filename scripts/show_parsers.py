@@ -0,0 +1,346 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from scripts.config_stream import stream_command
+from scripts.connection_pool import pool
+
+# Typed records for show command output, produced by templates in TextFSM's syntax
+# (Value lines, then states of "^regex -> Action" rules). The interpreter is small and
+# push-based: lines are fed one at a time and finished records come straight out,
+# so output streamed off the channel is parsed as it arrives and never held whole.
+#
+# Supported: Value options Filldown, Required and List; line actions Next and
+# Continue; record actions Record and Clear; a new state after the action. Values
+# whose group didn't take part in a match are reset, so an optional group can't
+# leave a filled-down value from an earlier line in place.
+
+Route = namedtuple("Route", ["protocol", "prefix", "length", "distance", "metric", "next_hop", "interface", "age"])
+InterfaceBrief = namedtuple("InterfaceBrief", ["interface", "address", "ok", "method", "status", "protocol"])
+IpAddress = namedtuple("IpAddress", ["interface", "address", "length"])
+RoutingProtocol = namedtuple("RoutingProtocol", ["protocol", "router_id", "networks", "neighbors", "distance"])
+
+LINE_OPS = ("Next", "Continue")
+RECORD_OPS = ("Record", "Clear")
+
+SHOW_IP_ROUTE = r"""
+Value Filldown protocol ([A-Za-z][*+%]?(?: ?(?:E1|E2|N1|N2|IA|EX|L1|L2|ia|su))?[*+%]?)
+Value Filldown prefix (\d+\.\d+\.\d+\.\d+)
+Value Filldown length (\d+)
+Value Filldown subnet_length (\d+)
+Value distance (\d+)
+Value metric (\d+)
+Value next_hop (\d+\.\d+\.\d+\.\d+)
+Value age (\d+:\d+:\d+|\d+[ywdh]\d*[ywdhm]?)
+Value interface (\S+)
+
+Start
+  ^\s+\S+/${subnet_length} is subnetted
+  ^\s+\S+ is variably subnetted
+  ^${protocol}\s+${prefix}(?:/${length})?\s+\[${distance}/${metric}\]\s+via\s+${next_hop}(?:,\s+${age})?(?:,\s+${interface})?\s*$$ -> Record
+  ^${protocol}\s+${prefix}(?:/${length})?\s+is directly connected,\s+(?:${age},\s+)?${interface}\s*$$ -> Record
+  ^${protocol}\s+${prefix}(?:/${length})?\s*$$
+  ^\s+\[${distance}/${metric}\]\s+via\s+${next_hop}(?:,\s+${age})?(?:,\s+${interface})?\s*$$ -> Record
+"""
+
+SHOW_IP_INTERFACE_BRIEF = r"""
+Value interface (\S+)
+Value address (\S+)
+Value ok (YES|NO)
+Value method (\S+)
+Value status (up|down|administratively down|deleted)
+Value protocol (up|down)
+
+Start
+  ^${interface}\s+${address}\s+${ok}\s+${method}\s+${status}\s+${protocol}\s*$$ -> Record
+"""
+
+SHOW_IP_INTERFACE = r"""
+Value Filldown interface (\S+)
+Value address (\d+\.\d+\.\d+\.\d+)
+Value length (\d+)
+
+Start
+  ^${interface} is (?:up|down|administratively down|deleted),
+  ^\s+Internet address is ${address}/${length} -> Record
+  ^\s+Secondary address ${address}/${length} -> Record
+"""
+
+SHOW_IP_PROTOCOLS = r"""
+Value Required protocol ([^"]+)
+Value router_id (\d+\.\d+\.\d+\.\d+)
+Value List networks (\S.*?)
+Value List neighbors (\d+\.\d+\.\d+\.\d+)
+Value distance (\d+)
+
+Start
+  ^Routing Protocol is -> Continue.Record
+  ^Routing Protocol is "${protocol}"
+  ^\s+Router ID ${router_id}
+  ^\s+Routing for Networks: -> Networks
+  ^\s+Routing Information Sources: -> Sources
+  ^\s+Distance: \(default is ${distance}\)
+
+Networks
+  ^\s+Routing Information Sources: -> Sources
+  ^\s+Distance: \(default is ${distance}\) -> Start
+  ^Routing Protocol is -> Continue.Record
+  ^Routing Protocol is "${protocol}" -> Start
+  ^\s{4}${networks}\s*$$
+  ^\s{2}\S -> Start
+
+Sources
+  ^\s+Gateway\s+Distance
+  ^\s+${neighbors}\s+\d+\s+\S+
+  ^\s+Distance: \(default is ${distance}\) -> Start
+  ^Routing Protocol is -> Continue.Record
+  ^Routing Protocol is "${protocol}" -> Start
+"""
+
+
+def _optional_int(value):
+    return int(value) if value is not None else None
+
+
+def _route(row):
+    length = row['length'] or row['subnet_length']
+    return Route(row['protocol'].strip(), row['prefix'], int(length) if length else 32,
+                 _optional_int(row['distance']), _optional_int(row['metric']),
+                 row['next_hop'], row['interface'], row['age'])
+
+
+def _interface_brief(row):
+    return InterfaceBrief(row['interface'], row['address'], row['ok'] == "YES", row['method'],
+                          row['status'], row['protocol'])
+
+
+def _ip_address(row):
+    return IpAddress(row['interface'], row['address'], int(row['length']))
+
+
+def _routing_protocol(row):
+    return RoutingProtocol(row['protocol'], row['router_id'], list(row['networks']),
+                           list(row['neighbors']), _optional_int(row['distance']))
+
+
+# command -> (template text, row to typed record)
+PARSERS = {
+    "show ip route": (SHOW_IP_ROUTE, _route),
+    "show ip interface brief": (SHOW_IP_INTERFACE_BRIEF, _interface_brief),
+    "show ip interface": (SHOW_IP_INTERFACE, _ip_address),
+    "show ip protocols": (SHOW_IP_PROTOCOLS, _routing_protocol),
+}
+
+
+class Rule:
+    __slots__ = ("regex", "line_op", "record_op", "new_state")
+
+    def __init__(self, regex, line_op, record_op, new_state):
+        self.regex = regex
+        self.line_op = line_op
+        self.record_op = record_op
+        self.new_state = new_state
+
+
+class Template:
+    def __init__(self, text):
+        self.values = {}
+        self.filldown = set()
+        self.required = set()
+        self.lists = set()
+        self.states = {}
+
+        state = None
+        for raw in text.splitlines():
+            line = raw.rstrip()
+            if not line or line.lstrip().startswith("#"):
+                continue
+            if line.startswith("Value "):
+                self._value(line)
+            elif not line[0].isspace():
+                state = line.strip()
+                self.states[state] = []
+            else:
+                if state is None:
+                    raise ValueError(f"Rule outside a state: {line.strip()!r}")
+                self.states[state].append(self._rule(line.strip()))
+
+        # plain values reset after every record; Filldown ones carry over
+        self.cleared = tuple(name for name in self.values if name not in self.filldown and name not in self.lists)
+
+        if "Start" not in self.states:
+            raise ValueError("Template has no Start state")
+        for rules in self.states.values():
+            for rule in rules:
+                if rule.new_state and rule.new_state not in self.states:
+                    raise ValueError(f"Unknown state {rule.new_state!r}")
+
+    def _value(self, line):
+        # Value [Option[,Option]] name (regex)
+        _, rest = line.split(None, 1)
+        head, _, regex = rest.partition(" (")
+        parts = head.split()
+        name = parts[-1]
+        options = parts[0].split(",") if len(parts) == 2 else []
+        self.values[name] = "(" + regex
+        for option in options:
+            if option == "Filldown":
+                self.filldown.add(name)
+            elif option == "Required":
+                self.required.add(name)
+            elif option == "List":
+                self.lists.add(name)
+            else:
+                raise ValueError(f"Unsupported value option {option!r}")
+
+    def _rule(self, text):
+        pattern, _, action = text.partition(" -> ")
+        # ${name} is the value's regex as a named group; $$ is a literal end anchor
+        pattern = re.sub(r"\$\{(\w+)\}", lambda m: f"(?P<{m.group(1)}>{self.values[m.group(1)]})", pattern)
+        pattern = pattern.replace("$$", "$")
+
+        line_op, record_op, new_state = "Next", None, None
+        parts = action.split()
+        if parts and all(op in LINE_OPS + RECORD_OPS for op in parts[0].split(".")):
+            for op in parts.pop(0).split("."):
+                if op in LINE_OPS:
+                    line_op = op
+                else:
+                    record_op = op
+        if parts:
+            new_state = parts[0]
+        return Rule(re.compile(pattern), line_op, record_op, new_state)
+
+
+@lru_cache(maxsize=None)
+def compile_template(text):
+    # regexes are compiled once per template per process, however often it's used
+    return Template(text)
+
+
+# One parse in progress: feed() lines, get back the records they completed
+class TemplateParser:
+    def __init__(self, template, convert=None):
+        self.template = template
+        self.convert = convert
+        self.state = "Start"
+        self.row = self._empty_row()
+
+    def _empty_row(self):
+        return {name: [] if name in self.template.lists else None for name in self.template.values}
+
+    def _clear(self):
+        row = self.row
+        for name in self.template.cleared:
+            row[name] = None
+        for name in self.template.lists:
+            if name not in self.template.filldown:
+                row[name] = []
+
+    def _record(self, records):
+        row = self.row
+        template = self.template
+        filled = any(row[name] for name in template.cleared) or \
+            any(row[name] for name in template.lists if name not in template.filldown)
+        if filled and all(row[name] for name in template.required):
+            records.append(self.convert(row) if self.convert else dict(row))
+        self._clear()
+
+    def feed(self, line):
+        records = []
+        line = line.rstrip("\r\n")
+        row = self.row
+        lists = self.template.lists
+        for rule in self.template.states[self.state]:
+            match = rule.regex.match(line)
+            if match is None:
+                continue
+            if lists:
+                for name, value in match.groupdict().items():
+                    if name not in lists:
+                        row[name] = value
+                    elif value is not None:
+                        row[name].append(value)
+            else:
+                row.update(match.groupdict())
+            if rule.record_op == "Record":
+                self._record(records)
+                row = self.row
+            elif rule.record_op == "Clear":
+                self._clear()
+            if rule.new_state:
+                self.state = rule.new_state
+            if rule.line_op == "Next":
+                break
+        return records
+
+    def finish(self):
+        # end of input records whatever is pending, as TextFSM does at EOF
+        records = []
+        self._record(records)
+        return records
+
+
+def get_parser(command):
+    # a fresh TemplateParser for command's output (whitespace-insensitive), or None
+    key = " ".join(command.split())
+    if key not in PARSERS:
+        return None
+    text, convert = PARSERS[key]
+    return TemplateParser(compile_template(text), convert)
+
+
+def parse_lines(command, lines):
+    # lines is any iterable (a list, an open file, a generator); records are yielded
+    # as soon as they are complete
+    parser = get_parser(command)
+    if parser is None:
+        raise ValueError(f"No parser for {command!r}")
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.finish()
+
+
+def parse_output(command, text):
+    return list(parse_lines(command, text.splitlines()))
+
+
+# stream_command sink that parses instead of storing: whole lines go to the parser
+# as they arrive and each finished record is handed to on_record
+class RecordSink:
+    def __init__(self, command, on_record):
+        self.parser = get_parser(command)
+        if self.parser is None:
+            raise ValueError(f"No parser for {command!r}")
+        self.on_record = on_record
+        self.partial = ""
+
+    def _emit(self, records):
+        for record in records:
+            self.on_record(record)
+
+    def write(self, text):
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            self._emit(self.parser.feed(line))
+
+    def commit(self, checksum):
+        if self.partial:
+            self._emit(self.parser.feed(self.partial))
+            self.partial = ""
+        self._emit(self.parser.finish())
+        return True
+
+    def abort(self):
+        self.partial = ""
+
+
+def show_records(device, command, on_record=None, read_timeout=120):
+    # Runs command over a pooled session and parses its output while it streams in.
+    # Records go to on_record as they're parsed, or are returned as a list without it.
+    records = []
+    sink = RecordSink(command, on_record or records.append)
+    with pool.session(device) as connection:
+        stream_command(connection, command, sink, read_timeout)
+    return records
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a walked column stays fresh, matched on the longest OID prefix.
+# Interface names rarely change; status columns and the syslog table do.
+DEFAULT_TTLS = {
+    (): 30,
+    (1, 3, 6, 1, 2, 1, 2, 2, 1, 2): 300,
+    (1, 3, 6, 1, 2, 1, 2, 2, 1, 7): 10,
+    (1, 3, 6, 1, 2, 1, 2, 2, 1, 8): 10,
+    (1, 3, 6, 1, 2, 1, 4, 20): 120,
+    (1, 3, 6, 1, 2, 1, 4, 21): 30,
+    (1, 3, 6, 1, 2, 1, 4, 24): 30,
+    (1, 3, 6, 1, 4, 1, 9, 9, 41): 5,
+}
+
+
+def _estimate_size(rows):
+    # rough per-entry footprint: three short strings in a tuple in a list
+    return 64 + sum(150 + len(index) + len(oid) + len(value) for index, oid, value in rows)
+
+
+# In-process cache of walked SNMP columns keyed by (ip, port, column OID), so views
+# that share a column and operators flipping between views don't re-poll the router.
+# Entries expire after their OID's TTL and the least recently used ones are dropped
+# once the estimated size passes max_bytes.
+class SnmpCache:
+    def __init__(self, ttls=None, max_bytes=32 * 1024 * 1024):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl_for(self, oid_tuple):
+        oid_tuple = tuple(oid_tuple)
+        for length in range(len(oid_tuple), -1, -1):
+            ttl = self.ttls.get(oid_tuple[:length])
+            if ttl is not None:
+                return ttl
+        return 0
+
+    def get(self, ip, port, oid_tuple):
+        key = (ip, port, tuple(oid_tuple))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, ip, port, oid_tuple, rows):
+        ttl = self.ttl_for(oid_tuple)
+        if ttl <= 0 or rows.partial:
+            return
+        key = (ip, port, tuple(oid_tuple))
+        size = _estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, rows, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self.size -= size
+
+    def invalidate(self, ip=None, oid_prefix=None):
+        with self._lock:
+            for key in list(self._entries):
+                if ip is not None and key[0] != ip:
+                    continue
+                if oid_prefix is not None and key[2][:len(oid_prefix)] != tuple(oid_prefix):
+                    continue
+                self._drop(key)
+
+    def clear(self):
+        self.invalidate()
+
+
+cache = SnmpCache()
@@ -0,0 +1,305 @@
+import threading
+
+# asyncio, pysnmp and pyasn1 together cost a few hundred milliseconds to import, so
+# they are loaded when the engine first starts rather than by every module (and every
+# menu) that imports this one
+asyncio = api = encoder = decoder = None
+
+
+def _load_snmp():
+    global asyncio, api, encoder, decoder
+    if api is None:
+        import asyncio as aio
+        from pyasn1.codec.ber import encoder as ber_encoder, decoder as ber_decoder
+        from pysnmp.proto import api as proto_api
+
+        asyncio, encoder, decoder, api = aio, ber_encoder, ber_decoder, proto_api
+
+
+# Column results from a walk. partial is set when the agent stopped answering before
+# the column reached its end, so the rows are a truncated table rather than all of it.
+class WalkResult(list):
+    partial = False
+
+
+# Smoothed RTT per agent (RFC 6298 style) used to size the retransmission timeout,
+# so fast agents are retried quickly and slow ones aren't given up on too early.
+# max_rto follows the caller's timeout: no single wait is longer than it allows.
+class RttEstimator:
+    def __init__(self, initial_rto, min_rto=0.2, max_rto=5.0):
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial_rto
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(self.max_rto, max(self.min_rto, self.srtt + 4 * self.rttvar))
+
+    def timeout(self, attempt):
+        # exponential backoff for retransmissions of one request
+        return min(self.max_rto, self.rto * 2 ** attempt)
+
+
+# asyncio.DatagramProtocol's interface, spelled out so asyncio isn't needed at import
+class _SnmpProtocol:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def connection_made(self, transport):
+        pass
+
+    def connection_lost(self, exc):
+        pass
+
+    def datagram_received(self, data, addr):
+        self.engine._dispatch(data, addr)
+
+    def error_received(self, exc):
+        pass
+
+
+# One asyncio loop and one UDP socket shared by every SNMP request in the process.
+# In-flight requests from any number of devices and walks are matched to their
+# responses by request ID, so polling many devices costs one pass of round trips
+# rather than one per device. The loop runs in a daemon thread; the *_sync
+# wrappers let the blocking menu code use it. Lost requests are retransmitted
+# with exponential backoff on top of a per-agent RTT estimate.
+class SnmpEngine:
+    def __init__(self, max_concurrency=256, retries=2):
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.v1_agents = set()
+        self.v2c_agents = set()
+        self.rtt = {}
+        self._pending = {}
+        self._transport = None
+        self._loop = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._open())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _open(self):
+        self._transport, _ = await self._loop.create_datagram_endpoint(
+            lambda: _SnmpProtocol(self), local_addr=("0.0.0.0", 0)
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def start(self):
+        with self._start_lock:
+            if self._loop is None:
+                _load_snmp()
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._run, name="snmp-engine", daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def _dispatch(self, wholeMsg, addr):
+        while wholeMsg:
+            try:
+                pMod = api.PROTOCOL_MODULES[int(api.decodeMessageVersion(wholeMsg))]
+                rspMsg, wholeMsg = decoder.decode(wholeMsg, asn1Spec=pMod.Message())
+            except Exception:
+                return
+            rspPDU = pMod.apiMessage.get_pdu(rspMsg)
+            future = self._pending.get(int(pMod.apiPDU.get_request_id(rspPDU)))
+            if future is not None and not future.done():
+                future.set_result(rspPDU)
+
+    def _estimator(self, ip, port, timeout, retries):
+        # the first wait leaves room for the retries inside timeout; the longest one
+        # never exceeds it, whatever timeout this caller asked for
+        estimator = self.rtt.get((ip, port))
+        if estimator is None:
+            estimator = self.rtt[(ip, port)] = RttEstimator(timeout / (retries + 1), max_rto=timeout)
+        estimator.max_rto = timeout
+        return estimator
+
+    async def request(self, reqMsg, request_id, ip, port, timeout, retries=None, deadline=None):
+        # Measured RTT decides how long to wait before each retransmission. All the
+        # attempts together end by deadline (default: timeout from now).
+        retries = self.retries if retries is None else retries
+        estimator = self._estimator(ip, port, timeout, retries)
+        deadline = self._loop.time() + timeout if deadline is None else deadline
+        wholeMsg = encoder.encode(reqMsg)
+
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        try:
+            for attempt in range(retries + 1):
+                sent = self._loop.time()
+                remaining = deadline - sent
+                if remaining <= 0:
+                    break
+                self._transport.sendto(wholeMsg, (ip, port))
+                try:
+                    # shield: a late reply to an earlier attempt still completes the request
+                    rspPDU = await asyncio.wait_for(asyncio.shield(future), min(estimator.timeout(attempt), remaining))
+                except asyncio.TimeoutError:
+                    continue
+                if attempt == 0:
+                    # Karn's rule: only unambiguous round trips feed the estimate
+                    estimator.sample(self._loop.time() - sent)
+                return rspPDU
+            raise asyncio.TimeoutError()
+        finally:
+            self._pending.pop(request_id, None)
+            future.cancel()
+
+    async def walk_columns(self, oid_tuples, ip, community="public", version="2c", max_repetitions=25,
+                           timeout=3, port=161, stats=None, retries=None):
+        # Until the agent first answers, the walk has timeout in total, v1 fallback
+        # included, so a dead agent costs timeout and no more. Afterwards every request
+        # gets timeout of its own, so a long walk that keeps answering isn't cut short.
+        async with self._semaphore:
+            agent = (ip, port)
+            contact = self._loop.time() + timeout
+            if version == "2c" and agent not in self.v1_agents:
+                if agent in self.v2c_agents:
+                    results, _ = await self._walk(oid_tuples, ip, community, api.SNMP_VERSION_2C, max_repetitions,
+                                                  timeout, port, stats, retries, contact)
+                    return results
+                # v1-only agents silently drop v2c messages, so an unknown agent gets half
+                # the budget for GetBulk and the rest for a GetNext walk
+                results, answered = await self._walk(oid_tuples, ip, community, api.SNMP_VERSION_2C,
+                                                     max_repetitions, timeout, port, stats, retries,
+                                                     contact - timeout / 2)
+                if answered:
+                    self.v2c_agents.add(agent)
+                    return results
+                results, answered = await self._walk(oid_tuples, ip, community, api.SNMP_VERSION_1,
+                                                     max_repetitions, timeout, port, stats, retries, contact)
+                if answered:
+                    # remember not to try GetBulk against this agent again
+                    self.v1_agents.add(agent)
+                return results
+
+            results, _ = await self._walk(
+                oid_tuples, ip, community, api.SNMP_VERSION_1, max_repetitions, timeout, port, stats, retries, contact
+            )
+            return results
+
+    async def _walk(self, oid_tuples, ip, community, snmp_version, max_repetitions, timeout, port, stats,
+                    retries, contact_deadline):
+        results = [WalkResult() for _ in oid_tuples]
+        answered = False
+        pMod = api.PROTOCOL_MODULES[snmp_version]
+        bulk = snmp_version == api.SNMP_VERSION_2C
+
+        roots = [pMod.ObjectIdentifier(oid_tuple) for oid_tuple in oid_tuples]
+        # column positions still being walked, and the last OID seen in each of them
+        active = list(range(len(roots)))
+        cursors = list(roots)
+        end_types = tuple(
+            getattr(pMod, name) for name in ("Null", "EndOfMibView", "NoSuchObject", "NoSuchInstance")
+            if hasattr(pMod, name)
+        )
+
+        if bulk:
+            reqPDU = pMod.GetBulkRequestPDU()
+            pMod.apiBulkPDU.set_defaults(reqPDU)
+            pMod.apiBulkPDU.set_non_repeaters(reqPDU, 0)
+            pMod.apiBulkPDU.set_max_repetitions(reqPDU, max_repetitions)
+            pduApi = pMod.apiBulkPDU
+        else:
+            reqPDU = pMod.GetNextRequestPDU()
+            pMod.apiPDU.set_defaults(reqPDU)
+            pduApi = pMod.apiPDU
+
+        reqMsg = pMod.Message()
+        pMod.apiMessage.set_defaults(reqMsg)
+        pMod.apiMessage.set_community(reqMsg, community)
+        pMod.apiMessage.set_pdu(reqMsg, reqPDU)
+
+        while active:
+            requested = list(active)
+            request_id = pMod.getNextRequestID()
+            pduApi.set_varbinds(reqPDU, [(cursors[column], pMod.null) for column in requested])
+            pduApi.set_request_id(reqPDU, request_id)
+
+            if stats is not None:
+                stats['requests'] = stats.get('requests', 0) + 1
+            try:
+                rspPDU = await self.request(reqMsg, int(request_id), ip, port, timeout, retries,
+                                            None if answered else contact_deadline)
+            except asyncio.TimeoutError:
+                for column in active:
+                    results[column].partial = True
+                break
+            answered = True
+
+            errorStatus = pMod.apiPDU.get_error_status(rspPDU)
+            if errorStatus == 2:
+                # noSuchName is how v1 agents report the end of the MIB for one varbind
+                errorIndex = int(pMod.apiPDU.get_error_index(rspPDU))
+                if 0 < errorIndex <= len(requested):
+                    active.remove(requested[errorIndex - 1])
+                else:
+                    active.clear()
+                continue
+            if errorStatus == 1 and bulk and pMod.apiBulkPDU.get_max_repetitions(reqPDU) > 1:
+                # tooBig: several columns x max_repetitions didn't fit, ask for fewer rows
+                repetitions = int(pMod.apiBulkPDU.get_max_repetitions(reqPDU))
+                pMod.apiBulkPDU.set_max_repetitions(reqPDU, repetitions // 2)
+                continue
+            if errorStatus:
+                print(f"Error:{errorStatus}")
+                raise Exception(errorStatus)
+
+            varBindTable = pduApi.get_varbind_table(reqPDU, rspPDU)
+            if not varBindTable:
+                active.clear()
+
+            for tableRow in varBindTable:
+                for column, (name, val) in zip(requested, tableRow):
+                    if column not in active:
+                        continue
+                    root = roots[column]
+                    if isinstance(val, end_types) or not root.isPrefixOf(name):
+                        active.remove(column)
+                        continue
+                    index = '.'.join(str(x) for x in name[len(root):])
+                    results[column].append((index, name.prettyPrint(), val.prettyPrint()))
+                    cursors[column] = name
+
+        return results, answered
+
+    async def walk_many(self, oid_tuples, targets, port=161, **kwargs):
+        # targets are ip strings or (ip, port) tuples; results are keyed the same way
+        walks = []
+        for target in targets:
+            ip, target_port = target if isinstance(target, tuple) else (target, port)
+            walks.append(self.walk_columns(oid_tuples, ip, port=target_port, **kwargs))
+        outcomes = await asyncio.gather(*walks, return_exceptions=True)
+        return dict(zip(targets, outcomes))
+
+    def walk_columns_sync(self, oid_tuples, ip, **kwargs):
+        self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self.walk_columns(oid_tuples, ip, **kwargs), self._loop
+        ).result()
+
+    def walk_columns_future(self, oid_tuples, ip, **kwargs):
+        # concurrent.futures.Future of the walk, for callers that keep many in flight
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self.walk_columns(oid_tuples, ip, **kwargs), self._loop)
+
+    def walk_many_sync(self, oid_tuples, targets, **kwargs):
+        self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self.walk_many(oid_tuples, targets, **kwargs), self._loop
+        ).result()
+
+
+engine = SnmpEngine()
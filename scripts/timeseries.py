@@ -0,0 +1,173 @@
+import math
+import os
+import pickle
+import threading
+from array import array
+
+# (seconds per point, points kept) from finest to coarsest: a day at one minute,
+# a week at five minutes and 90 days at one hour. Every value goes into all tiers,
+# each averaging it into its own buckets, so older data is already downsampled.
+DEFAULT_TIERS = ((60, 1440), (300, 2016), (3600, 2160))
+
+STORE_VERSION = 1
+
+
+def timeseries_path():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.abspath(os.path.join(base_dir, "..", "configuration", ".timeseries"))
+
+
+# Fixed-size round-robin buffer of bucket averages (float32, NaN = no data). Bucket
+# b lives in slot b % size, so memory never grows no matter how long it's fed.
+class Ring:
+    __slots__ = ("step", "values", "bucket", "total", "count")
+
+    def __init__(self, step, size):
+        self.step = step
+        self.values = array('f', [math.nan]) * size
+        self.bucket = None
+        self.total = 0.0
+        self.count = 0
+
+    def _flush(self):
+        if self.count:
+            self.values[self.bucket % len(self.values)] = self.total / self.count
+
+    def add(self, timestamp, value):
+        bucket = int(timestamp // self.step)
+        if bucket != self.bucket:
+            if self.bucket is not None:
+                if bucket < self.bucket:
+                    # clock went backwards; fold the sample into the current bucket
+                    bucket = self.bucket
+                else:
+                    self._flush()
+                    # buckets skipped while nothing was polled are gaps, not old data
+                    for missing in range(self.bucket + 1, min(bucket, self.bucket + len(self.values) + 1)):
+                        self.values[missing % len(self.values)] = math.nan
+            if bucket != self.bucket:
+                self.bucket = bucket
+                self.total = 0.0
+                self.count = 0
+        self.total += value
+        self.count += 1
+
+    def points(self, start=None, end=None):
+        # (bucket start time, average) oldest first, the still-open bucket included
+        if self.bucket is None:
+            return []
+        size = len(self.values)
+        first = self.bucket - size + 1
+        if start is not None:
+            first = max(first, int(start // self.step))
+        last = self.bucket if end is None else min(self.bucket, int(end // self.step))
+        result = []
+        for bucket in range(first, last + 1):
+            if bucket == self.bucket:
+                value = self.total / self.count if self.count else math.nan
+            else:
+                value = self.values[bucket % size]
+            if not math.isnan(value):
+                result.append((bucket * self.step, value))
+        return result
+
+    def oldest(self):
+        return None if self.bucket is None else (self.bucket - len(self.values) + 1) * self.step
+
+
+class Series:
+    __slots__ = ("rings", "last_update")
+
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self.rings = [Ring(step, size) for step, size in tiers]
+        self.last_update = None
+
+    def add(self, timestamp, value):
+        for ring in self.rings:
+            ring.add(timestamp, value)
+        self.last_update = timestamp
+
+    def query(self, start=None, end=None):
+        # the finest tier whose retention still reaches back to start
+        for ring in self.rings:
+            oldest = ring.oldest()
+            if start is None or oldest is None or oldest <= start:
+                return ring.step, ring.points(start, end)
+        ring = self.rings[-1]
+        return ring.step, ring.points(start, end)
+
+
+# Time series per device, keyed by a metric name such as "Gi0/1 in_bps". Each device
+# is saved to its own <root>/<name>.ts file (a pickle of the rings' raw float32
+# arrays), so the poller can persist one device without rewriting the others.
+class TimeSeriesStore:
+    def __init__(self, root=None, tiers=DEFAULT_TIERS):
+        self.root = root or timeseries_path()
+        self.tiers = tiers
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def _path(self, device_name):
+        return os.path.join(self.root, f"{device_name}.ts")
+
+    def _series(self, device_name):
+        series = self._devices.get(device_name)
+        if series is None:
+            series = self._devices[device_name] = self._load(device_name)
+        return series
+
+    def add(self, device_name, key, timestamp, value):
+        with self._lock:
+            series = self._series(device_name)
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = Series(self.tiers)
+            entry.add(timestamp, value)
+
+    def query(self, device_name, key, start=None, end=None):
+        # (seconds per point, [(time, value), ...]); (None, []) for an unknown series
+        with self._lock:
+            entry = self._series(device_name).get(key)
+            return entry.query(start, end) if entry else (None, [])
+
+    def keys(self, device_name):
+        with self._lock:
+            return sorted(self._series(device_name))
+
+    def expire(self, device_name, older_than):
+        # drops series (e.g. of a removed interface) that haven't been fed since older_than
+        with self._lock:
+            series = self._series(device_name)
+            stale = [key for key, entry in series.items()
+                     if entry.last_update is not None and entry.last_update < older_than]
+            for key in stale:
+                del series[key]
+            return len(stale)
+
+    def _load(self, device_name):
+        try:
+            with open(self._path(device_name), 'rb') as f:
+                saved = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return {}
+        if saved.get('version') != STORE_VERSION or saved.get('tiers') != self.tiers:
+            return {}
+        return saved['series']
+
+    def save(self, device_name):
+        with self._lock:
+            series = self._devices.get(device_name)
+            if series is None:
+                return
+            data = pickle.dumps({'version': STORE_VERSION, 'tiers': self.tiers, 'series': series},
+                                protocol=pickle.HIGHEST_PROTOCOL)
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(device_name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def save_all(self):
+        for name in list(self._devices):
+            self.save(name)
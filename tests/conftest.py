@@ -0,0 +1,27 @@
+import pytest
+
+from benchmarks.snmp_responder import SnmpResponder, cidr_route_table, interface_table
+from scripts.data_sources import router
+from scripts.snmp_cache import cache
+
+
+@pytest.fixture
+def snmp_agent():
+    # Starts a stub SNMP agent answering from table (oid tuple -> value), plus an
+    # ipCidrRouteTable for routes ((dest, mask, next hop, proto) tuples) and an
+    # ifTable of `interfaces` rows; returns a device dict pointing at it
+    responders = []
+
+    def start(table=None, routes=(), interfaces=0):
+        table = dict(table or {})
+        table.update(interface_table(interfaces))
+        table.update(cidr_route_table(routes))
+        responders.append(SnmpResponder(table).start())
+        cache.clear()
+        router.reset()
+        return {'name': "R1", 'hostname': "127.0.0.1", 'snmp_port': responders[-1].port}
+
+    yield start
+    for responder in responders:
+        responder.stop()
+    router.reset()
@@ -0,0 +1,158 @@
+from contextlib import contextmanager
+
+from scripts import device_config
+from scripts.config_parser import config_delta, diff_configs, parse_config
+
+RUNNING = """hostname R1
+banner motd ^C
+Authorized access only
+^C
+ip access-list extended EDGE
+ permit tcp any any eq 22
+ deny ip any any
+access-list 101 permit ip host 1.1.1.1 any
+access-list 101 deny ip any any
+ip prefix-list PL seq 5 permit 10.0.0.0/8
+route-map RM permit 10
+ match ip address prefix-list PL
+ set local-preference 200
+interface Ethernet0/0
+ ip address 10.0.0.1 255.255.255.0
+"""
+
+
+def delta(running, target):
+    return config_delta(parse_config(running), parse_config(target))
+
+
+def test_unchanged_config_needs_no_commands():
+    assert delta(RUNNING, RUNNING) == []
+
+
+def test_changed_banner_is_replaced_whole_with_a_closing_delimiter():
+    target = RUNNING.replace("Authorized access only", "Authorised access only\nDisconnect now ^ #")
+    commands = delta(RUNNING, target)
+    start = commands.index("banner motd %")
+    assert commands[start:start + 4] == ["banner motd %", "Authorised access only", "Disconnect now ^ #", "%"]
+    assert not any(c.startswith("no ") and "Authorized" in c for c in commands)
+    assert "exit" not in commands
+
+
+def test_one_line_banner_is_redelimited():
+    assert delta("banner login #Hi#\n", "banner login ^CHello^C\n") == ["banner login ^Hello^"]
+
+
+FRAMED = "banner motd ^C\n*****\nAuthorized only\n*****\n^C\n"
+
+
+def test_repeated_banner_lines_are_kept():
+    tree = parse_config(FRAMED)
+    assert [line for _, line in tree.lines()] == ["banner motd ^C", "*****", "Authorized only", "*****", "^C"]
+    assert delta("", FRAMED) == ["banner motd ^", "*****", "Authorized only", "*****", "^"]
+
+
+def test_dropped_repeated_banner_line_is_a_change():
+    unframed = FRAMED.replace("Authorized only\n*****\n", "Authorized only\n")
+    assert [entry.op for entry in diff_configs(parse_config(FRAMED), parse_config(unframed))] == ["-", "+"]
+    assert delta(unframed, FRAMED) == ["banner motd ^", "*****", "Authorized only", "*****", "^"]
+
+
+def test_certificate_body_is_replaced_whole():
+    chain = "crypto pki certificate chain TP\n certificate self-signed 01\n  3082 0101\n  3082 0101\n  \tquit\n"
+    target = chain.replace("3082 0101\n  \tquit", "3082 0202\n  \tquit")
+    assert delta(chain, target) == [
+        "crypto pki certificate chain TP",
+        "no certificate self-signed 01",
+        "certificate self-signed 01",
+        "3082 0101",
+        "3082 0202",
+        "quit",
+        "exit",
+    ]
+
+
+def test_removed_banner_is_removed_by_type():
+    assert delta(RUNNING, RUNNING.replace("banner motd ^C\nAuthorized access only\n^C\n", "")) == ["no banner motd"]
+
+
+def test_named_acl_is_rewritten_in_target_order():
+    target = RUNNING.replace(" permit tcp any any eq 22\n", " permit tcp any any eq 22\n permit tcp any any eq 443\n")
+    assert delta(RUNNING, target) == [
+        "no ip access-list extended EDGE",
+        "ip access-list extended EDGE",
+        "permit tcp any any eq 22",
+        "permit tcp any any eq 443",
+        "deny ip any any",
+        "exit",
+    ]
+
+
+def test_reordered_acl_is_rewritten():
+    target = RUNNING.replace(" permit tcp any any eq 22\n deny ip any any\n", " deny ip any any\n permit tcp any any eq 22\n")
+    commands = delta(RUNNING, target)
+    assert commands[0] == "no ip access-list extended EDGE"
+    assert commands[2:4] == ["deny ip any any", "permit tcp any any eq 22"]
+
+
+def test_numbered_acl_is_rewritten_whole():
+    target = RUNNING.replace("access-list 101 permit ip host 1.1.1.1 any\n",
+                             "access-list 101 permit ip host 2.2.2.2 any\naccess-list 101 permit ip host 1.1.1.1 any\n")
+    assert delta(RUNNING, target) == [
+        "no access-list 101",
+        "access-list 101 permit ip host 2.2.2.2 any",
+        "access-list 101 permit ip host 1.1.1.1 any",
+        "access-list 101 deny ip any any",
+    ]
+
+
+def test_prefix_list_and_route_map_entries_are_replaced():
+    target = RUNNING.replace("seq 5 permit 10.0.0.0/8", "seq 5 permit 10.0.0.0/8 le 24").replace("200", "300")
+    assert delta(RUNNING, target) == [
+        "no ip prefix-list PL",
+        "ip prefix-list PL seq 5 permit 10.0.0.0/8 le 24",
+        "no route-map RM permit 10",
+        "route-map RM permit 10",
+        "match ip address prefix-list PL",
+        "set local-preference 300",
+        "exit",
+    ]
+
+
+def test_other_sections_are_still_patched_line_by_line():
+    target = RUNNING.replace("10.0.0.1", "10.0.0.2")
+    assert delta(RUNNING, target) == ["interface Ethernet0/0", "ip address 10.0.0.2 255.255.255.0", "exit"]
+
+
+class FakeConnection:
+    def __init__(self, running):
+        self.running = running
+        self.sent = []
+
+    def send_command(self, command, read_timeout=None):
+        return self.running
+
+    def send_config_set(self, commands, read_timeout=None):
+        self.sent.extend(commands)
+        return ""
+
+
+class FakePool:
+    def __init__(self, connection):
+        self.connection = connection
+
+    @contextmanager
+    def session(self, device, **extra):
+        yield self.connection
+
+
+def test_rollback_restores_a_whole_numbered_acl(monkeypatch):
+    after = RUNNING.replace("access-list 101 deny ip any any\n",
+                            "access-list 101 permit ip host 9.9.9.9 any\naccess-list 101 deny ip any any\n")
+    connection = FakeConnection(after)
+    monkeypatch.setattr(device_config, "pool", FakePool(connection))
+    device_config.rollback_config({'name': "R1", 'hostname': "192.0.2.10"}, parse_config(RUNNING))
+    assert connection.sent == [
+        "no access-list 101",
+        "access-list 101 permit ip host 1.1.1.1 any",
+        "access-list 101 deny ip any any",
+    ]
@@ -0,0 +1,26 @@
+import pytest
+
+from scripts.config_store import ConfigStore
+
+CONFIGS = ["hostname R1\n!\ninterface Ethernet0/0\n!\n", "hostname R1\n!\ninterface Ethernet0/1\n!\n",
+           "hostname R2\n!\ninterface Ethernet0/1\n!\n"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ConfigStore(root=str(tmp_path))
+    for config in CONFIGS:
+        store.put("R1", config)
+    return store
+
+
+def test_prune_keeps_the_newest_versions(store):
+    newest = store.history("R1")[-1]
+    store.prune(keep_last=1)
+    assert store.history("R1") == [newest]
+
+
+def test_prune_rejects_keep_last_zero(store):
+    with pytest.raises(ValueError):
+        store.prune(keep_last=0)
+    assert len(store.history("R1")) == len(CONFIGS)
@@ -0,0 +1,43 @@
+import pytest
+
+from scripts.config_stream import FileSink, stream_command
+
+
+class DeadConnection:
+    RETURN = "\n"
+
+    def find_prompt(self):
+        raise OSError("Socket is closed")
+
+
+class FakeConnection:
+    RETURN = "\n"
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def find_prompt(self):
+        return "R1#"
+
+    def write_channel(self, text):
+        pass
+
+    def read_channel(self):
+        return self.chunks.pop(0) if self.chunks else ""
+
+
+def test_dead_channel_leaves_no_temp_file(tmp_path):
+    sink = FileSink(str(tmp_path / "R1_Backup.cfg"))
+    with pytest.raises(OSError):
+        stream_command(DeadConnection(), "show running-config", sink)
+    assert list(tmp_path.iterdir()) == []
+    assert sink.file.closed
+
+
+def test_output_is_streamed_without_echo_or_prompt(tmp_path):
+    path = tmp_path / "R1_Backup.cfg"
+    connection = FakeConnection(["show running-config\r\nhostname R1\r\n", "interface Ethernet0/0\r\nR1#"])
+    _, written = stream_command(connection, "show running-config", FileSink(str(path)))
+    assert path.read_text() == "hostname R1\ninterface Ethernet0/0\n"
+    assert written == len(path.read_text())
+    assert [p.name for p in tmp_path.iterdir()] == ["R1_Backup.cfg"]
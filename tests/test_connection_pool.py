@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from scripts.connection_pool import ConnectionPool, PooledSession
+
+DEVICE = {'name': "R1"}
+
+
+class FakeConnection:
+    def __init__(self, extra):
+        self.extra = extra
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def disconnect(self):
+        self.alive = False
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.opened = []
+
+    def _connect(self, device, **extra):
+        connection = FakeConnection(extra)
+        self.opened.append(connection)
+        return PooledSession(connection)
+
+
+def test_idle_session_is_reused_only_with_the_same_extras():
+    pool = FakePool()
+    with pool.session(DEVICE) as first:
+        pass
+    with pool.session(DEVICE) as again:
+        assert again is first
+    with pool.session(DEVICE, conn_timeout=90) as other:
+        assert other is not first
+        assert other.extra == {'conn_timeout': 90}
+
+
+def test_other_extras_free_an_idle_slot_when_the_device_is_full():
+    pool = FakePool(max_sessions=1, checkout_timeout=0.1)
+    with pool.session(DEVICE) as first:
+        pass
+    with pool.session(DEVICE, session_log="debug.log") as logged:
+        assert logged.extra == {'session_log': "debug.log"}
+    assert not first.alive
+
+
+def test_session_is_discarded_after_an_exception():
+    pool = FakePool()
+    with pytest.raises(ValueError):
+        with pool.session(DEVICE) as failed:
+            raise ValueError("parse error")
+    assert not failed.alive
+    with pool.session(DEVICE) as fresh:
+        assert fresh is not failed
+
+
+def test_idle_sessions_are_reaped_on_release():
+    pool = FakePool(idle_timeout=60)
+    with pool.session(DEVICE, conn_timeout=90):
+        with pool.session(DEVICE) as stale:
+            pass
+        pool._idle[("R1", ())][0].last_used -= 120
+    assert not stale.alive
+    assert pool._open["R1"] == 1
+
+
+def test_disconnects_do_not_hold_up_other_devices():
+    pool = FakePool()
+    with pool.session(DEVICE) as slow:
+        pass
+    disconnected = threading.Event()
+
+    def disconnect():
+        disconnected.set()
+        time.sleep(1)
+
+    slow.disconnect = disconnect
+    closer = threading.Thread(target=pool.close, args=("R1",))
+    closer.start()
+    disconnected.wait(1)
+    started = time.monotonic()
+    with pool.session({'name': "R2"}):
+        pass
+    assert time.monotonic() - started < 0.5
+    closer.join()
@@ -0,0 +1,98 @@
+import pytest
+
+from scripts import data_sources, device_mgmt
+from scripts.data_sources import QUERIES, DataRouter, compare_sources
+from scripts.device_mgmt import Records
+from scripts.show_parsers import parse_output
+
+# one device, as its SNMP agent and its CLI each describe it
+ROUTES = [
+    ("0.0.0.0", "0.0.0.0", "192.0.2.1", 3),
+    ("10.0.0.0", "255.0.0.0", "10.255.0.2", 13),
+    ("10.1.2.0", "255.255.255.0", "10.255.0.3", 13),
+    ("10.1.2.0", "255.255.255.0", "10.255.0.4", 13),
+]
+
+SHOW = {
+    "show ip route": """Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP
+Gateway of last resort is 192.0.2.1 to network 0.0.0.0
+
+S*    0.0.0.0/0 [1/0] via 192.0.2.1
+      10.0.0.0/8 is variably subnetted, 2 subnets, 2 masks
+O        10.0.0.0/8 [110/20] via 10.255.0.2, 00:01:02, Ethernet0/0
+O        10.1.2.0/24 [110/20] via 10.255.0.3, 00:01:02, Ethernet0/0
+                     [110/20] via 10.255.0.4, 00:01:02, Ethernet0/0
+""",
+    "show ip interface brief": """Interface              IP-Address      OK? Method Status                Protocol
+Ethernet0/0            10.255.0.1      YES manual up                    up
+Ethernet0/1            unassigned      YES unset  administratively down down
+""",
+    "show ip interface": """Ethernet0/0 is up, line protocol is up
+  Internet address is 10.255.0.1/24
+  Broadcast address is 255.255.255.255
+Ethernet0/1 is administratively down, line protocol is down
+  Internet protocol processing disabled
+""",
+}
+
+
+def agent_table():
+    table = {}
+    for index, name, status in ((1, "Ethernet0/0", 1), (2, "Ethernet0/1", 2)):
+        table[(1, 3, 6, 1, 2, 1, 2, 2, 1, 2, index)] = name
+        table[(1, 3, 6, 1, 2, 1, 2, 2, 1, 7, index)] = status
+        table[(1, 3, 6, 1, 2, 1, 2, 2, 1, 8, index)] = status
+    address = (10, 255, 0, 1)
+    table[(1, 3, 6, 1, 2, 1, 4, 20, 1, 1) + address] = "10.255.0.1"
+    table[(1, 3, 6, 1, 2, 1, 4, 20, 1, 2) + address] = 1
+    table[(1, 3, 6, 1, 2, 1, 4, 20, 1, 3) + address] = "255.255.255.0"
+    return table
+
+
+@pytest.fixture
+def device(snmp_agent, monkeypatch):
+    monkeypatch.setattr(data_sources, "show_records",
+                        lambda device, command, read_timeout=120: parse_output(command, SHOW[command]))
+    return snmp_agent(agent_table(), routes=ROUTES)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_snmp_and_ssh_return_the_same_records(device, query):
+    only = compare_sources(device, query, timeout=3)
+    assert only == {'snmp': [], 'ssh': []}
+
+
+def test_compare_sources_reports_disagreement():
+    sources = {'routes': {
+        'snmp': lambda device, timeout: [{'destination': "10.0.0.0", 'mask': "255.0.0.0", 'next_hop': "1.1.1.1"}],
+        'ssh': lambda device, timeout: [{'destination': "10.0.0.0", 'mask': "255.0.0.0", 'next_hop': "2.2.2.2"}],
+    }}
+    only = compare_sources({'name': "R1"}, "routes", sources=sources)
+    assert only['snmp'][0]['next_hop'] == "1.1.1.1"
+    assert only['ssh'][0]['next_hop'] == "2.2.2.2"
+
+
+def test_timeout_reaches_the_snmp_walk(monkeypatch):
+    seen = []
+
+    def fake_walk(oid, ip, **kwargs):
+        seen.append(kwargs['timeout'])
+        return Records()
+
+    monkeypatch.setattr(device_mgmt, "snmp_walk", fake_walk)
+    DataRouter().fetch({'name': "R1", 'hostname': "127.0.0.1"}, "routes", timeout=7, source="snmp")
+    assert seen == [7]
+
+
+def test_snmp_gets_its_own_budget_when_routed(monkeypatch):
+    seen = []
+
+    def fake_walk(oid, ip, **kwargs):
+        seen.append(kwargs['timeout'])
+        raise TimeoutError("no response")
+
+    monkeypatch.setattr(device_mgmt, "snmp_walk", fake_walk)
+    monkeypatch.setattr(data_sources, "show_records", lambda device, command, read_timeout=120: [])
+    records, source = DataRouter().fetch({'name': "R1", 'hostname': "127.0.0.1"}, "routes", timeout=60)
+    assert (records, source) == ([], "ssh")
+    assert seen == [data_sources.BUDGETS['snmp']]
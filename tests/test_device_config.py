@@ -0,0 +1,41 @@
+import threading
+import time
+
+from scripts import cli, device_config
+
+
+class FakeInventory:
+    def __init__(self, devices):
+        self.devices = devices
+
+    def select(self, selector, name=None):
+        return [d for d in self.devices if not name or d['name'] in name]
+
+
+DEVICES = [{'name': f"R{i}", 'hostname': f"192.0.2.{i}"} for i in range(1, 6)]
+
+
+def test_push_waves_and_timeout_come_from_the_cli(monkeypatch, capsys):
+    events = []
+    lock = threading.Lock()
+
+    def fake_send(device, commands, read_timeout=60):
+        with lock:
+            events.append(("start", device['name'], read_timeout))
+        time.sleep(0.02)
+        with lock:
+            events.append(("end", device['name'], read_timeout))
+        return ""
+
+    monkeypatch.setattr(device_config, "send_config", fake_send)
+    monkeypatch.setattr(cli, "inventory", FakeInventory(DEVICES))
+    assert cli.main(["hostname", "CORE", "--timeout", "7", "--wave-size", "2", "--workers", "10",
+                     "--format", "json"]) == 0
+
+    assert {timeout for _, _, timeout in events} == {7}
+    # canary R1 alone, then waves of two, each starting once the one before has ended
+    starts = [name for op, name, _ in events if op == "start"]
+    assert starts[0] == "R1" and set(starts[1:3]) == {"R2", "R3"} and set(starts[3:]) == {"R4", "R5"}
+    for wave, previous in ((("R2", "R3"), ("R1",)), (("R4", "R5"), ("R2", "R3"))):
+        first_start = min(events.index(("start", name, 7)) for name in wave)
+        assert all(events.index(("end", name, 7)) < first_start for name in previous)
@@ -0,0 +1,30 @@
+import subprocess
+
+from scripts.git_batch import CommitBatcher
+
+
+def git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+def test_commit_keeps_stdout_clean(tmp_path, capfd):
+    remote, repo = tmp_path / "remote.git", tmp_path / "repo"
+    git(tmp_path, "init", "-q", "--bare", str(remote))
+    git(tmp_path, "init", "-q", str(repo))
+    git(repo, "config", "user.email", "backup@example.com")
+    git(repo, "config", "user.name", "backup")
+    git(repo, "remote", "add", "origin", str(remote))
+    git(repo, "commit", "-q", "--allow-empty", "-m", "init")
+    git(repo, "push", "-q", "-u", "origin", "HEAD")
+
+    path = repo / "R1_Backup.cfg"
+    path.write_text("hostname R1\n")
+    batcher = CommitBatcher(repo_dir=str(repo))
+    batcher.add(path)
+    assert batcher.commit("batch") == [str(path)]
+    batcher.add(path)
+    assert batcher.commit("batch") == []
+
+    out, err = capfd.readouterr()
+    assert out == ""
+    assert "No configuration changes to commit." in err
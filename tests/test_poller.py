@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+from scripts import poller
+from scripts.poller import Poller
+from scripts.timeseries import TimeSeriesStore
+
+ROUTES = [("10.0.0.0", "255.0.0.0", "10.255.0.2", 13), ("0.0.0.0", "0.0.0.0", "192.0.2.1", 3)]
+
+
+def test_counters_and_routes_are_walked_separately(snmp_agent, tmp_path):
+    device = snmp_agent({(1, 3, 6, 1, 2, 1, 2, 2, 1, 10, idx): 1000 * idx for idx in range(1, 5)},
+                        routes=ROUTES, interfaces=4)
+    p = Poller([device], store=TimeSeriesStore(tmp_path), interval=0.2, route_every=2, timeout=1)
+    p.run(1.2)
+    assert p.polls["R1"] >= 3
+    assert p.errors["R1"] == 0
+    assert p.routes.lookup("10.1.1.1")["R1"].prefix == "10.0.0.0"
+    assert "routes" in p.store.keys("R1")
+    assert "Ethernet0/1 in_bps" in p.store.keys("R1")
+
+
+def test_jitter_does_not_accumulate(monkeypatch, tmp_path):
+    # every random draw at its maximum: the phase is a full interval, every offset +jitter
+    monkeypatch.setattr(poller.random, "uniform", lambda low, high: high)
+    started = []
+    p = Poller([{'name': "R1", 'hostname': "127.0.0.1"}], store=TimeSeriesStore(tmp_path), interval=0.2,
+               jitter=0.25)
+    monkeypatch.setattr(p, "_start_poll", lambda name: started.append(time.monotonic()))
+    p.run(1.3)
+    assert len(started) >= 5
+    # polls after the first sit at base + one fixed offset, one interval apart on average
+    assert started[-1] - started[1] == pytest.approx(0.2 * (len(started) - 2), abs=0.04)
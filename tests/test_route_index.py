@@ -0,0 +1,75 @@
+import json
+import random
+
+import pytest
+
+from scripts import cli
+from scripts.device_mgmt import route_table
+from scripts.route_index import MASKS, RouteIndex, routes_from_records, to_int
+
+ROUTES = [
+    ("10.0.0.0", "255.0.0.0", "10.255.0.2", 13),
+    ("10.1.2.0", "255.255.255.0", "10.255.0.3", 13),
+    ("10.1.2.0", "255.255.255.0", "10.255.0.4", 13),
+    ("0.0.0.0", "0.0.0.0", "192.0.2.1", 3),
+]
+
+
+class FakeInventory:
+    def __init__(self, devices):
+        self.devices = devices
+
+    def select(self, selector, name=None):
+        return [d for d in self.devices if not name or d['name'] in name]
+
+
+@pytest.fixture
+def agent(snmp_agent):
+    return snmp_agent(routes=ROUTES)
+
+
+def test_route_table_decodes_mask_and_next_hop_from_the_index(agent):
+    records = route_table(agent)
+    assert sorted((r['destination'], r['mask'], r['next_hop']) for r in records) == sorted(
+        (dest, mask, next_hop) for dest, mask, next_hop, _ in ROUTES)
+
+
+def test_lookup_over_snmp(agent, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "inventory", FakeInventory([agent]))
+    assert cli.main(["lookup", "10.1.2.3", "10.9.9.9", "8.8.8.8", "--source", "snmp", "--format", "json",
+                     "--timeout", "3"]) == 0
+    rows = {row['address']: row for row in json.loads(capsys.readouterr().out)}
+    assert rows["10.1.2.3"]['prefix'] == "10.1.2.0/24"
+    assert rows["10.1.2.3"]['next_hop'] == "10.255.0.3, 10.255.0.4"
+    assert rows["10.9.9.9"]['prefix'] == "10.0.0.0/8"
+    assert rows["8.8.8.8"]['prefix'] == "0.0.0.0/0"
+    assert {row['source'] for row in rows.values()} == {"snmp"}
+
+
+def test_index_matches_a_linear_scan_across_syncs():
+    rng = random.Random(1)
+    index = RouteIndex()
+    table = {}
+    for _ in range(5):
+        for key in rng.sample(sorted(table), len(table) // 3):
+            del table[key]
+        for _ in range(400):
+            length = rng.choice([0, 8, 12, 16, 17, 20, 22, 24, 24, 32])
+            table[(rng.getrandbits(32) & MASKS[length], length)] = f"10.0.0.{rng.randrange(1, 4)}"
+        index.sync((network, length, hop) for (network, length), hop in table.items())
+
+        for _ in range(300):
+            address = rng.getrandbits(32)
+            covering = [(length, network) for network, length in table if address & MASKS[length] == network]
+            match = index.lookup(address)
+            if not covering:
+                assert match is None
+            else:
+                length, network = max(covering)
+                assert (to_int(match.prefix), match.length) == (network, length)
+                assert match.next_hops == (table[(network, length)],)
+
+
+def test_non_contiguous_masks_are_skipped():
+    records = [{'destination': "10.0.0.0", 'mask': "255.0.255.0", 'next_hop': "10.0.0.1"}]
+    assert list(routes_from_records(records)) == []